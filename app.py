@@ -1,8 +1,14 @@
+import math
 import os
-import uuid
+import threading
+import weakref
 
+import click
+import orjson
 from flask import (
+    Blueprint,
     Flask,
+    current_app,
     render_template,
     request,
     redirect,
@@ -11,40 +17,133 @@ from flask import (
     url_for,
     flash,
     jsonify,
+    make_response,
+    g,
 )
-from werkzeug.utils import secure_filename
-from sqlalchemy import or_
 
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy.orm import joinedload, load_only
+from PIL import Image
 from models import db, User, Property, PropertyImage
-from locations import DISTRICT_WIJKEN
+from locations import DISTRICT_WIJKEN, location_labels
+from search import relevance_key, reindex_properties
+from pagination import paginate_keyset
+from facets import facet_counts
+from images import (
+    allowed_file,
+    generate_variants,
+    hash_photo,
+    store_photo,
+    image_files,
+    delete_files,
+    photo_lock,
+    photo_locks,
+)
+from listing_form import ListingError, parse_listing
+from bulk import (
+    IMPORT_BATCH_SIZE,
+    PHOTO_WORKERS,
+    export_listings,
+    file_format,
+    import_listings,
+)
+from jobs import WorkerPool, enqueue, handler, work
+from page_cache import PageCache
+from conditional import conditional
+from assets import DIST_DIR, Assets, build_assets
+from currency import BASE_CURRENCY, set_rate
+from geo import cluster_markers, parse_bbox
+from listings import listing_filter, listing_query
+from sql_stats import SQLStats, query_budget
+from metrics import IMAGE_PROCESSING_SECONDS, UPLOAD_BYTES, Metrics
+from passwords import HasherBusy, PasswordHasher
+from rate_limit import TokenBucketLimiter
+from config import engine_options, load_config
 
 
 # --------------------------------------------------
 # APP CONFIG
 # --------------------------------------------------
 
-app = Flask(__name__)
-app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key")
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, "static", "uploads")
 MAX_PHOTOS_PER_PROPERTY = 10
+LISTINGS_PER_PAGE = 12
+DASHBOARD_PER_PAGE = 24
 
-# Ensure upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+migrate = Migrate()
+
+# Query count / DB time per request: Server-Timing header, log line, budgets
+sql_stats = SQLStats()
+
+# Prometheus metrics at /metrics (see metrics.py)
+metrics = Metrics()
+
+# Rendered listing and detail pages for anonymous visitors
+page_cache = PageCache()
+
+# Fingerprinted CSS/JS, built by 'flask assets-build'
+static_assets = Assets()
+
+# Password hashing in a bounded process pool (see passwords.py)
+password_hasher = PasswordHasher()
+
+# Brute-force limits on /login and /register, per client IP and per e-mail
+login_ip_limit = TokenBucketLimiter(capacity=10, per_seconds=6)
+login_email_limit = TokenBucketLimiter(capacity=5, per_seconds=60)
+register_ip_limit = TokenBucketLimiter(capacity=3, per_seconds=120)
+
+# Photo processing and file cleanup run in the background (see jobs.py)
+job_workers = WorkerPool()
+
+# Views, error handlers and CLI commands; registered on every app
+# create_app() builds
+bp = Blueprint("main", __name__, cli_group=None)
+
+# Every app built here, for _dispose_engines
+_apps = weakref.WeakSet()
+
+
+def _dispose_engines():
+    # gunicorn --preload imports the app before forking its workers: a worker
+    # must not reuse connections the parent opened, so it starts with new
+    # pools (close=False leaves the parent's connections alone)
+    for app in list(_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_engines)
 
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
-    "DATABASE_URL", "sqlite:///realestate.db"
-)
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
+def create_app(config_name=None):
+    """Build the app for a profile of config.py (default: ``APP_CONFIG``)."""
+    app = Flask(__name__)
+    app.config.from_object(load_config(config_name))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
 
-db.init_app(app)
-migrate = Migrate(app, db)
+    # Ensure upload folder exists
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    sql_stats.init_app(app)
+    metrics.init_app(app)
+    page_cache.init_app(app)
+    static_assets.init_app(app)
+    password_hasher.init_app(app)
+    job_workers.init_app(app)
+
+    # The limits need the client's IP: behind Render's proxy it is taken from
+    # X-Forwarded-For. Only set this when a proxy is in front, it is spoofable
+    if app.config["TRUSTED_PROXIES"]:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["TRUSTED_PROXIES"])
+
+    app.register_blueprint(bp)
+    app.jinja_env.filters.update(TEMPLATE_FILTERS)
+
+    _apps.add(app)
+    return app
 
 
 # --------------------------------------------------
@@ -52,40 +151,188 @@ migrate = Migrate(app, db)
 # --------------------------------------------------
 
 
-def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
-
-
 def get_current_user_id():
     return session.get("user_id")
 
 
-def apply_filters(query, args):
-    if args.get("status"):
-        query = query.filter(Property.status == args.get("status").lower())
-    if args.get("type_object"):
-        query = query.filter(Property.type_object == args.get("type_object").lower())
-    if args.get("valuta"):
-        query = query.filter(Property.valuta == args.get("valuta").upper())
-    if args.get("min_prijs"):
-        try:
-            query = query.filter(Property.prijs >= float(args.get("min_prijs")))
-        except ValueError:
-            pass
-    if args.get("max_prijs"):
+def listing_changed(property_id, *type_objects):
+    """Expire cached pages that show a listing after a write.
+
+    Pass every ``type_object`` the listing had before and after the write.
+    """
+    page_cache.invalidate(
+        ["listings:all", f"property:{property_id}"]
+        + [f"listings:{type_object}" for type_object in set(type_objects)]
+    )
+
+
+def enqueue_image_processing(image):
+    enqueue(
+        "process_image",
+        {"image_id": image.id},
+        key=f"process_image:{image.id}",
+    )
+
+
+def hash_uploads(photos):
+    """``(photo, image_path, content_hash)`` for the uploads that could be read."""
+    uploads = []
+    for photo in photos:
         try:
-            query = query.filter(Property.prijs <= float(args.get("max_prijs")))
-        except ValueError:
-            pass
-    if args.get("q"):
-        zoekterm = f"%{args.get('q').strip().lower()}%"
-        query = query.filter(
-            or_(
-                Property.titel.ilike(zoekterm),
-                Property.beschrijving.ilike(zoekterm),
-            )
+            image_path, content_hash = hash_photo(photo)
+        except Exception as e:
+            print(f"Error uploading photo: {e}")
+            continue
+        # hash_photo leaves the stream at its end
+        UPLOAD_BYTES.observe(photo.stream.tell())
+        uploads.append((photo, image_path, content_hash))
+    return uploads
+
+
+def enqueue_file_release(image):
+    """Queue removal of a photo's files once no other image references them."""
+    enqueue(
+        "delete_files",
+        {"paths": image_files(image), "content_hash": image.content_hash},
+    )
+
+
+def load_primary_images(properties):
+    """Fetch the card image of every listing on a page in a single query.
+
+    Returns a dict of ``property_id -> PropertyImage``. The ordering matches
+    ``Property.images``, so a listing without a primary image falls back to
+    its first photo.
+    """
+    property_ids = [p.id for p in properties]
+    if not property_ids:
+        return {}
+
+    images = (
+        PropertyImage.query.filter(PropertyImage.property_id.in_(property_ids))
+        .order_by(
+            PropertyImage.property_id,
+            PropertyImage.is_primary.desc(),
+            PropertyImage.sort_order.asc(),
+            PropertyImage.id.asc(),
         )
-    return query
+        .all()
+    )
+
+    primary_images = {}
+    for image in images:
+        primary_images.setdefault(image.property_id, image)
+    return primary_images
+
+
+def count_photos(properties):
+    """Number of photos per listing on a page, in a single query."""
+    property_ids = [p.id for p in properties]
+    if not property_ids:
+        return {}
+
+    rows = (
+        db.session.query(PropertyImage.property_id, db.func.count(PropertyImage.id))
+        .filter(PropertyImage.property_id.in_(property_ids))
+        .group_by(PropertyImage.property_id)
+        .all()
+    )
+    return dict(rows)
+
+
+# Grid sort orders: ``sort`` arg -> keyset keys (a third item marks a key
+# whose NULLs sort last). Each ends with the id and is backed by composite
+# indexes on Property for the usual filters (type_object, status).
+LISTING_SORTS = {
+    "": [(Property.id, True)],
+    # No SRD price when the listing's currency has no exchange rate
+    "prijs_oplopend": [(Property.prijs_srd, False, True), (Property.id, False)],
+    "prijs_aflopend": [(Property.prijs_srd, True, True), (Property.id, True)],
+    "prijs_m2_oplopend": [(Property.prijs_per_m2, False, True), (Property.id, False)],
+    "perceel_groot": [(Property.perceel_m2, True, True), (Property.id, True)],
+    "woon_groot": [(Property.woon_m2, True, True), (Property.id, True)],
+}
+
+
+def sort_keys(query, args):
+    """Sort keys for the ``sort`` arg; newest first by default.
+
+    Returned as ``(expression, descending)`` pairs for keyset pagination,
+    always ending with the unique ``Property.id``.
+    """
+    sort = args.get("sort", "")
+    if sort == "relevantie" and args.get("q"):
+        rank = relevance_key(query, args.get("q"))
+        if rank is not None:
+            return [rank, (Property.id, True)]
+    return LISTING_SORTS.get(sort, LISTING_SORTS[""])
+
+
+def listing_state(type_object=None):
+    """Conditional GET validator for a listing grid.
+
+    The newest ``updated_at`` among the matches plus their number: a removed
+    listing changes the count, any other write changes the timestamp. Both
+    only go into the ETag: a delete doesn't move the newest timestamp, so the
+    grids send no ``Last-Modified`` that ``If-Modified-Since`` could match.
+    """
+    query = listing_query(listing_filter(request.args, type_object))
+    count, updated_at = query.with_entities(
+        db.func.count(Property.id), db.func.max(Property.updated_at)
+    ).one()
+    # Shown as "N advertenties gevonden", so the page matches its ETag
+    g.listing_count = count
+    return None, updated_at, count
+
+
+def load_listing(property_id):
+    """A listing with its owner, in one query."""
+    return (
+        Property.query.options(joinedload(Property.owner).load_only(User.id, User.naam))
+        .filter_by(id=property_id)
+        .first()
+    )
+
+
+def property_state(property_id):
+    """Conditional GET validator for a listing's detail page."""
+    updated_at = (
+        db.session.query(Property.updated_at).filter_by(id=property_id).scalar()
+    )
+    return (updated_at,) if updated_at else None
+
+
+def render_listings(template, only_type=None, **context):
+    """A listing grid: one keyset page plus the number of matches.
+
+    The shared body of home, huizen (``only_type="huis"``) and percelen.
+    """
+    spec = listing_filter(request.args, only_type)
+    query = listing_query(spec)
+    pagination = paginate_keyset(
+        query, sort_keys(query, request.args), request.args, LISTINGS_PER_PAGE
+    )
+    # Counted by the listing_state validator, unless conditional skipped it
+    pagination.total = g.pop("listing_count", None)
+    if pagination.total is None:
+        pagination.total = query.order_by(None).count()
+
+    return render_template(
+        template,
+        properties=pagination.items,
+        primary_images=load_primary_images(pagination.items),
+        pagination=pagination,
+        wijken=DISTRICT_WIJKEN.get(spec.district, []),
+        q=request.args.get("q", ""),
+        district=request.args.get("district"),
+        wijk=request.args.get("wijk"),
+        status=request.args.get("status", ""),
+        valuta=request.args.get("valuta", ""),
+        min_prijs=request.args.get("min_prijs"),
+        max_prijs=request.args.get("max_prijs"),
+        sort=request.args.get("sort", ""),
+        **context,
+    )
 
 
 # --------------------------------------------------
@@ -121,8 +368,26 @@ def format_currency(value, currency="SRD"):
         return value
 
 
-app.jinja_env.filters["price"] = format_price
-app.jinja_env.filters["currency"] = format_currency
+def image_path(image, size="full"):
+    """Static path of a photo variant, falling back to the original."""
+    variant = (image.variants or {}).get(size) or {}
+    return variant.get("jpeg") or variant.get("webp") or image.image_path
+
+
+def image_srcset(image):
+    """``srcset`` value listing all WebP variants of a photo."""
+    return ", ".join(
+        f"{url_for('static', filename=variant['webp'])} {variant['width']}w"
+        for variant in (image.variants or {}).values()
+    )
+
+
+TEMPLATE_FILTERS = {
+    "price": format_price,
+    "currency": format_currency,
+    "image_path": image_path,
+    "srcset": image_srcset,
+}
 
 
 # --------------------------------------------------
@@ -130,141 +395,273 @@ app.jinja_env.filters["currency"] = format_currency
 # --------------------------------------------------
 
 
-@app.route("/api/wijken/<district>")
+@bp.route("/api/wijken/<district>")
 def api_wijken(district):
     return jsonify(DISTRICT_WIJKEN.get(district.lower(), []))
 
 
-# --------------------------------------------------
-# HOME
-# --------------------------------------------------
+@bp.route("/api/facets")
+def api_facets():
+    return jsonify(facet_counts(listing_filter(request.args)))
+
+
+# Listing fields of /api/properties; ``fields=`` picks a subset. Columns
+# that aren't asked for are not loaded (beschrijving is the heavy one).
+API_COLUMNS = (
+    "titel",
+    "type_object",
+    "status",
+    "prijs",
+    "valuta",
+    "prijs_srd",
+    "prijs_per_m2",
+    "grondrecht",
+    "perceel_oppervlakte",
+    "perceel_eenheid",
+    "woon_oppervlakte",
+    "woon_eenheid",
+    "perceel_m2",
+    "woon_m2",
+    "district",
+    "wijk",
+    "latitude",
+    "longitude",
+    "beschrijving",
+    "updated_at",
+)
+# Derived fields -> the columns they are computed from
+API_DERIVED = {"locatie": ("district", "wijk"), "url": ()}
+API_FIELDS = API_COLUMNS + tuple(API_DERIVED) + ("primary_image", "images")
 
+API_LIST_FIELDS = tuple(f for f in API_FIELDS if f not in ("beschrijving", "images"))
+API_DETAIL_FIELDS = tuple(f for f in API_FIELDS if f != "primary_image")
+API_MAX_LIMIT = 50
 
-@app.route("/")
-def home():
-    query = Property.query
 
-    district = request.args.get("district")
-    wijk = request.args.get("wijk")
+def api_response(data, status=200):
+    return current_app.response_class(
+        orjson.dumps(data, option=orjson.OPT_NAIVE_UTC),
+        status=status,
+        mimetype="application/json",
+    )
+
 
-    if district:
-        query = query.filter(Property.district.ilike(f"{district.lower()}%"))
-    if wijk:
-        query = query.filter(Property.district.ilike(f"%{wijk.lower()}"))
+def api_fields(default):
+    """Fields asked for with ``fields=``, or None if one is unknown."""
+    if not request.args.get("fields"):
+        return default
+    fields = tuple(f.strip() for f in request.args["fields"].split(",") if f.strip())
+    if not set(fields) <= set(API_FIELDS):
+        return None
+    return fields
 
-    query = apply_filters(query, request.args)
 
-    page = request.args.get("page", 1, type=int)
-    pagination = query.order_by(Property.id.desc()).paginate(
-        page=page, per_page=12, error_out=False
+def load_api_columns(query, fields):
+    columns = {f for f in fields if f in API_COLUMNS}
+    for field in fields:
+        columns.update(API_DERIVED.get(field, ()))
+    return query.options(
+        load_only(Property.id, *(getattr(Property, name) for name in sorted(columns)))
     )
 
-    wijken = DISTRICT_WIJKEN.get(district.lower(), []) if district else []
 
-    return render_template(
-        "index.html",
-        properties=pagination.items,
-        pagination=pagination,
-        wijken=wijken,
-        q=request.args.get("q", ""),
-        district=district,
-        wijk=wijk,
-        status=request.args.get("status", ""),
-        type_object=request.args.get("type_object", ""),
-        valuta=request.args.get("valuta", ""),
-        min_prijs=request.args.get("min_prijs"),
-        max_prijs=request.args.get("max_prijs"),
+def static_url(path):
+    return url_for("static", filename=path, _external=True)
+
+
+def api_image(image):
+    return {
+        "id": image.id,
+        "is_primary": bool(image.is_primary),
+        "url": static_url(image.image_path),
+        "variants": {
+            size: {
+                "width": variant["width"],
+                **{
+                    fmt: static_url(variant[fmt])
+                    for fmt in ("webp", "jpeg")
+                    if fmt in variant
+                },
+            }
+            for size, variant in (image.variants or {}).items()
+        },
+    }
+
+
+def api_listing(listing, fields, images=()):
+    data = {"id": listing.id}
+    for field in fields:
+        if field in API_COLUMNS or field == "locatie":
+            data[field] = getattr(listing, field)
+        elif field == "url":
+            data[field] = url_for(
+                "main.property_detail", property_id=listing.id, _external=True
+            )
+        elif field == "primary_image":
+            data[field] = api_image(images[0]) if images else None
+        elif field == "images":
+            data[field] = [api_image(image) for image in images]
+    return data
+
+
+@bp.route("/api/properties")
+@query_budget(3)
+@page_cache.cached(tags=lambda: ["listings:all"])
+@conditional(listing_state)
+def api_properties():
+    """Listings matching the grid filters, one keyset page at a time.
+
+    Takes the same args as the grids (filters, ``sort``, ``after`` /
+    ``before``) plus ``limit`` and ``fields``.
+    """
+    fields = api_fields(API_LIST_FIELDS)
+    if fields is None:
+        return api_response({"error": "Onbekend veld in fields."}, 400)
+    try:
+        limit = min(int(request.args.get("limit", LISTINGS_PER_PAGE)), API_MAX_LIMIT)
+    except ValueError:
+        limit = LISTINGS_PER_PAGE
+
+    query = load_api_columns(listing_query(listing_filter(request.args)), fields)
+    page = paginate_keyset(
+        query, sort_keys(query, request.args), request.args, max(limit, 1)
     )
 
+    primary_images = (
+        load_primary_images(page.items) if "primary_image" in fields else {}
+    )
+    items = []
+    for listing in page.items:
+        image = primary_images.get(listing.id)
+        items.append(api_listing(listing, fields, [image] if image else []))
+
+    def page_url(**cursor):
+        return url_for("main.api_properties", **page.args, **cursor, _external=True)
+
+    return api_response(
+        {
+            "items": items,
+            "next": page_url(after=page.next_cursor) if page.has_next else None,
+            "prev": page_url(before=page.prev_cursor) if page.has_prev else None,
+        }
+    )
 
-# --------------------------------------------------
-# HUIZEN PAGE
-# --------------------------------------------------
 
+@bp.route("/api/properties/<int:property_id>")
+@query_budget(3)
+@page_cache.cached(tags=lambda property_id: [f"property:{property_id}"])
+@conditional(property_state)
+def api_property(property_id):
+    fields = api_fields(API_DETAIL_FIELDS)
+    if fields is None:
+        return api_response({"error": "Onbekend veld in fields."}, 400)
 
-@app.route("/huizen")
-def huizen():
-    query = Property.query.filter_by(type_object="huis")
+    listing = load_api_columns(Property.query, fields).filter_by(id=property_id).first()
+    if listing is None:
+        return api_response({"error": "Advertentie niet gevonden."}, 404)
 
-    district = request.args.get("district")
-    wijk = request.args.get("wijk")
+    images = []
+    if "images" in fields or "primary_image" in fields:
+        images = (
+            PropertyImage.query.filter_by(property_id=property_id)
+            .order_by(
+                PropertyImage.is_primary.desc(),
+                PropertyImage.sort_order.asc(),
+                PropertyImage.id.asc(),
+            )
+            .all()
+        )
+    return api_response(api_listing(listing, fields, images))
 
-    if district:
-        query = query.filter(Property.district.ilike(f"{district.lower()}%"))
-    if wijk:
-        query = query.filter(Property.district.ilike(f"%{wijk.lower()}"))
 
-    query = apply_filters(query, request.args)
+@bp.route("/api/map")
+@query_budget(2)
+@page_cache.cached(tags=lambda: ["listings:all"])
+@conditional(listing_state)
+def api_map():
+    """Clustered markers of the listings in a viewport (``bbox``).
 
-    page = request.args.get("page", 1, type=int)
-    pagination = query.order_by(Property.id.desc()).paginate(
-        page=page, per_page=12, error_out=False
-    )
+    Takes the listing filters of the grids; a marker of one listing carries
+    its id, for /api/properties/<id>.
+    """
+    bbox = parse_bbox(request.args.get("bbox"))
+    if bbox is None:
+        return api_response({"error": "Geef bbox=zuid,west,noord,oost op."}, 400)
 
-    wijken = DISTRICT_WIJKEN.get(district.lower(), []) if district else []
+    spec = listing_filter(request.args)
+    precision, markers = cluster_markers(listing_query(spec), *bbox)
+    return api_response({"precision": precision, "markers": markers})
 
-    return render_template(
-        "huizen.html",
-        properties=pagination.items,
-        pagination=pagination,
-        wijken=wijken,
-        q=request.args.get("q", ""),
-        district=district,
-        wijk=wijk,
-        status=request.args.get("status", ""),
-        valuta=request.args.get("valuta", ""),
-        min_prijs=request.args.get("min_prijs"),
-        max_prijs=request.args.get("max_prijs"),
+
+# --------------------------------------------------
+# HOME
+# --------------------------------------------------
+
+
+@bp.route("/")
+@query_budget(5)
+@page_cache.cached(tags=lambda: ["listings:all"])
+@conditional(listing_state)
+def home():
+    return render_listings(
+        "index.html", type_object=request.args.get("type_object", "")
     )
 
 
+# --------------------------------------------------
+# HUIZEN PAGE
+# --------------------------------------------------
+
+
+@bp.route("/huizen")
+@query_budget(5)
+@page_cache.cached(tags=lambda: ["listings:huis"])
+@conditional(lambda: listing_state("huis"))
+def huizen():
+    return render_listings("huizen.html", "huis")
+
+
 # --------------------------------------------------
 # PERCELEN PAGE
 # --------------------------------------------------
 
 
-@app.route("/percelen")
+@bp.route("/percelen")
+@query_budget(5)
+@page_cache.cached(tags=lambda: ["listings:perceel"])
+@conditional(lambda: listing_state("perceel"))
 def percelen():
-    query = Property.query.filter_by(type_object="perceel")
+    return render_listings("percelen.html", "perceel")
 
-    district = request.args.get("district")
-    wijk = request.args.get("wijk")
 
-    if district:
-        query = query.filter(Property.district.ilike(f"{district.lower()}%"))
-    if wijk:
-        query = query.filter(Property.district.ilike(f"%{wijk.lower()}"))
+# --------------------------------------------------
+# AUTH
+# --------------------------------------------------
 
-    query = apply_filters(query, request.args)
 
-    page = request.args.get("page", 1, type=int)
-    pagination = query.order_by(Property.id.desc()).paginate(
-        page=page, per_page=12, error_out=False
-    )
+BUSY_MESSAGE = "Het is op dit moment erg druk. Probeer het zo opnieuw."
+BUSY_RETRY_AFTER = 5
 
-    wijken = DISTRICT_WIJKEN.get(district.lower(), []) if district else []
 
-    return render_template(
-        "percelen.html",
-        properties=pagination.items,
-        pagination=pagination,
-        wijken=wijken,
-        q=request.args.get("q", ""),
-        district=district,
-        wijk=wijk,
-        status=request.args.get("status", ""),
-        valuta=request.args.get("valuta", ""),
-        min_prijs=request.args.get("min_prijs"),
-        max_prijs=request.args.get("max_prijs"),
-    )
+def auth_refused(template, message, status, retry_after):
+    """Re-show a login/register form with an error and a Retry-After."""
+    flash(message, "danger")
+    response = make_response(render_template(template), status)
+    response.retry_after = math.ceil(retry_after)
+    return response
 
 
-# --------------------------------------------------
-# AUTH
-# --------------------------------------------------
+def rehash_password(user, password):
+    """Store a fresh hash if the hash parameters changed since the last one."""
+    try:
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+    except HasherBusy:
+        pass  # next login
 
 
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         email = request.form.get("email", "").strip()
@@ -274,23 +671,43 @@ def login():
             flash("E-mail en wachtwoord zijn verplicht.", "danger")
             return render_template("login.html")
 
+        wait = login_ip_limit.hit(request.remote_addr) or login_email_limit.hit(
+            email.lower()
+        )
+        if wait:
+            return auth_refused(
+                "login.html",
+                f"Te veel inlogpogingen. Probeer het over {math.ceil(wait)} "
+                "seconden opnieuw.",
+                429,
+                wait,
+            )
+
         user = User.query.filter_by(email=email).first()
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and password_hasher.verify(
+                user.password_hash, password
+            )
+        except HasherBusy:
+            return auth_refused("login.html", BUSY_MESSAGE, 503, BUSY_RETRY_AFTER)
+
+        if valid:
+            rehash_password(user, password)
             session["user_id"] = user.id
             flash("Succesvol ingelogd.", "success")
-            return redirect(url_for("home"))
+            return redirect(url_for("main.home"))
         flash("Ongeldige e-mail of wachtwoord.", "danger")
     return render_template("login.html")
 
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     session.pop("user_id", None)
     flash("Je bent uitgelogd.", "info")
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 
-@app.route("/register", methods=["GET", "POST"])
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
         naam = request.form.get("naam", "").strip()
@@ -301,30 +718,43 @@ def register():
         # Validation
         if not all([naam, email, password, password_confirm]):
             flash("Alle velden zijn verplicht.", "danger")
-            return redirect(url_for("register"))
+            return redirect(url_for("main.register"))
 
         # Check password confirmation
         if password != password_confirm:
             flash("Wachtwoorden komen niet overeen.", "danger")
-            return redirect(url_for("register"))
+            return redirect(url_for("main.register"))
 
         if len(password) < 6:
             flash("Wachtwoord moet minimaal 6 karakters zijn.", "danger")
-            return redirect(url_for("register"))
+            return redirect(url_for("main.register"))
+
+        wait = register_ip_limit.hit(request.remote_addr)
+        if wait:
+            return auth_refused(
+                "register.html",
+                f"Te veel registraties. Probeer het over {math.ceil(wait)} "
+                "seconden opnieuw.",
+                429,
+                wait,
+            )
 
         if User.query.filter_by(email=email).first():
             flash("Dit e-mailadres bestaat al.", "danger")
-            return redirect(url_for("register"))
+            return redirect(url_for("main.register"))
 
         user = User(naam=naam, email=email)
-        user.set_password(password)
+        try:
+            user.password_hash = password_hasher.hash(password)
+        except HasherBusy:
+            return auth_refused("register.html", BUSY_MESSAGE, 503, BUSY_RETRY_AFTER)
 
         db.session.add(user)
         db.session.commit()
 
         session["user_id"] = user.id
         flash("Account aangemaakt. Welkom!", "success")
-        return redirect(url_for("home"))
+        return redirect(url_for("main.home"))
 
     return render_template("register.html")
 
@@ -334,18 +764,43 @@ def register():
 # --------------------------------------------------
 
 
-@app.route("/dashboard")
+@bp.route("/dashboard")
+@query_budget(4)
 def dashboard():
     user_id = get_current_user_id()
     if not user_id:
         flash("Log eerst in.", "warning")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
-    properties = (
-        Property.query.filter_by(user_id=user_id).order_by(Property.id.desc()).all()
+    # Listings per status, for the tabs; their sum is the account's total
+    status_counts = dict(
+        db.session.query(Property.status, db.func.count(Property.id))
+        .filter(Property.user_id == user_id)
+        .group_by(Property.status)
+        .all()
     )
 
-    return render_template("dashboard.html", properties=properties)
+    query = Property.query.filter_by(user_id=user_id)
+    status = request.args.get("status", "")
+    if status:
+        query = query.filter_by(status=status)
+
+    pagination = paginate_keyset(
+        query, [(Property.id, True)], request.args, DASHBOARD_PER_PAGE
+    )
+    pagination.total = (
+        status_counts.get(status, 0) if status else sum(status_counts.values())
+    )
+
+    return render_template(
+        "dashboard.html",
+        properties=pagination.items,
+        primary_images=load_primary_images(pagination.items),
+        photo_counts=count_photos(pagination.items),
+        pagination=pagination,
+        status_counts=status_counts,
+        status=status,
+    )
 
 
 # --------------------------------------------------
@@ -353,71 +808,21 @@ def dashboard():
 # --------------------------------------------------
 
 
-@app.route("/add_property", methods=["GET", "POST"])
+@bp.route("/add_property", methods=["GET", "POST"])
 def add_property():
     user_id = get_current_user_id()
     if not user_id:
         flash("Log eerst in.", "warning")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     if request.method == "POST":
-        # Validation
-        titel = request.form.get("titel", "").strip()
-        type_object = request.form.get("type_object", "").lower()
-        status = request.form.get("status", "").lower()
-        prijs = request.form.get("prijs")
-        district = request.form.get("district", "").strip()
-
-        if not all([titel, type_object, status, prijs, district]):
-            flash("Vul alle verplichte velden in.", "danger")
-            return redirect(request.url)
-
         try:
-            prijs = float(prijs)
-            if prijs < 0:
-                raise ValueError
-        except ValueError:
-            flash("Ongeldige prijs.", "danger")
+            fields = parse_listing(request.form)
+        except ListingError as e:
+            flash(str(e), "danger")
             return redirect(request.url)
 
-        wijk = request.form.get("wijk", "").strip()
-        full_district = f"{district} - {wijk}" if wijk else district
-
-        # Get optional fields
-        grondrecht = request.form.get("grondrecht", "").strip() or None
-        perceel_oppervlakte = request.form.get("perceel_oppervlakte")
-        perceel_eenheid = request.form.get("perceel_eenheid", "").strip() or None
-        woon_oppervlakte = request.form.get("woon_oppervlakte")
-        woon_eenheid = request.form.get("woon_eenheid", "").strip() or None
-
-        # Convert to float if provided
-        try:
-            perceel_oppervlakte = (
-                float(perceel_oppervlakte) if perceel_oppervlakte else None
-            )
-        except (ValueError, TypeError):
-            perceel_oppervlakte = None
-
-        try:
-            woon_oppervlakte = float(woon_oppervlakte) if woon_oppervlakte else None
-        except (ValueError, TypeError):
-            woon_oppervlakte = None
-
-        listing = Property(
-            titel=titel,
-            type_object=type_object,
-            status=status,
-            prijs=prijs,
-            valuta=request.form.get("valuta", "SRD").upper(),
-            grondrecht=grondrecht,
-            perceel_oppervlakte=perceel_oppervlakte,
-            perceel_eenheid=perceel_eenheid,
-            woon_oppervlakte=woon_oppervlakte,
-            woon_eenheid=woon_eenheid,
-            district=full_district.lower(),
-            beschrijving=request.form.get("beschrijving", "").strip(),
-            user_id=user_id,
-        )
+        listing = Property(**fields, user_id=user_id)
 
         db.session.add(listing)
         db.session.commit()
@@ -436,30 +841,33 @@ def add_property():
             db.session.commit()
             return redirect(request.url)
 
-        first = True
-        for idx, photo in enumerate(valid_photos):
-            try:
-                ext = secure_filename(photo.filename).rsplit(".", 1)[1].lower()
-                filename = f"{uuid.uuid4().hex}.{ext}"
-                filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                photo.save(filepath)
+        # Each photo stays locked until its row is committed, see photo_lock
+        uploads = hash_uploads(valid_photos)
+        with photo_locks(current_app.static_folder, [u[2] for u in uploads]):
+            first = True
+            for idx, (photo, image_path, content_hash) in enumerate(uploads):
+                try:
+                    store_photo(photo, current_app.static_folder, image_path)
 
-                db.session.add(
-                    PropertyImage(
+                    image = PropertyImage(
                         property_id=listing.id,
-                        image_path=f"uploads/{filename}",
+                        image_path=image_path,
+                        content_hash=content_hash,
                         is_primary=first,
                         sort_order=idx,
                     )
-                )
-                first = False
-            except Exception as e:
-                print(f"Error uploading photo: {e}")
-                continue
+                    db.session.add(image)
+                    db.session.flush()
+                    enqueue_image_processing(image)
+                    first = False
+                except Exception as e:
+                    print(f"Error uploading photo: {e}")
+                    continue
 
-        db.session.commit()
+            db.session.commit()
+        listing_changed(listing.id, listing.type_object)
         flash("Advertentie succesvol geplaatst.", "success")
-        return redirect(url_for("dashboard"))
+        return redirect(url_for("main.dashboard"))
 
     return render_template("add_property.html")
 
@@ -469,39 +877,39 @@ def add_property():
 # --------------------------------------------------
 
 
-@app.route("/property/<int:property_id>")
+@bp.route("/property/<int:property_id>")
+@query_budget(3)
+@page_cache.cached(tags=lambda property_id: [f"property:{property_id}"])
+@conditional(property_state)
 def property_detail(property_id):
-    listing = db.session.get(Property, property_id)
+    listing = load_listing(property_id)
     if not listing:
         abort(404)
 
-    is_owner = get_current_user_id() == listing.user_id
-
-    district_parts = listing.district.split(" - ")
-    breadcrumb_district = district_parts[0].capitalize()
-    breadcrumb_wijk = (
-        district_parts[1].capitalize() if len(district_parts) > 1 else None
-    )
+    def render_gallery():
+        images = listing.images  # one query, in the relationship's order
+        return render_template(
+            "property_gallery.html",
+            listing=listing,
+            images=images,
+            primary_image=images[0] if images else None,
+        )
 
-    images = (
-        PropertyImage.query.filter_by(property_id=listing.id)
-        .order_by(PropertyImage.is_primary.desc(), PropertyImage.sort_order.asc())
-        .all()
+    # Photo changes also bump updated_at, so an edit gets a new fragment
+    gallery = page_cache.fragment(
+        ("property_gallery", listing.id, listing.updated_at), render_gallery
     )
-
-    primary_image = next(
-        (img for img in images if img.is_primary),
-        images[0] if images else None,
+    breadcrumb_district, breadcrumb_wijk = location_labels(
+        listing.district, listing.wijk
     )
 
     return render_template(
         "property_detail.html",
         listing=listing,
-        is_owner=is_owner,
+        is_owner=get_current_user_id() == listing.user_id,
         breadcrumb_district=breadcrumb_district,
         breadcrumb_wijk=breadcrumb_wijk,
-        images=images,
-        primary_image=primary_image,
+        gallery=gallery,
     )
 
 
@@ -510,7 +918,7 @@ def property_detail(property_id):
 # --------------------------------------------------
 
 
-@app.route("/property/<int:property_id>/edit", methods=["GET", "POST"])
+@bp.route("/property/<int:property_id>/edit", methods=["GET", "POST"])
 def edit_property(property_id):
     listing = db.session.get(Property, property_id)
     if not listing:
@@ -520,6 +928,8 @@ def edit_property(property_id):
         abort(403)
 
     if request.method == "POST":
+        old_type_object = listing.type_object
+
         # Update fields with validation
         titel = request.form.get("titel", "").strip()
         prijs = request.form.get("prijs")
@@ -592,29 +1002,32 @@ def edit_property(property_id):
             or 0
         )
 
-        for idx, photo in enumerate(valid_photos):
-            try:
-                ext = secure_filename(photo.filename).rsplit(".", 1)[1].lower()
-                filename = f"{uuid.uuid4().hex}.{ext}"
-                filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                photo.save(filepath)
+        # Each photo stays locked until its row is committed, see photo_lock
+        uploads = hash_uploads(valid_photos)
+        with photo_locks(current_app.static_folder, [u[2] for u in uploads]):
+            for idx, (photo, image_path, content_hash) in enumerate(uploads):
+                try:
+                    store_photo(photo, current_app.static_folder, image_path)
 
-                db.session.add(
-                    PropertyImage(
+                    image = PropertyImage(
                         property_id=listing.id,
-                        image_path=f"uploads/{filename}",
+                        image_path=image_path,
+                        content_hash=content_hash,
                         is_primary=False if has_primary else True,
                         sort_order=max_order + idx + 1,
                     )
-                )
-                has_primary = True
-            except Exception as e:
-                print(f"Error uploading photo: {e}")
-                continue
+                    db.session.add(image)
+                    db.session.flush()
+                    enqueue_image_processing(image)
+                    has_primary = True
+                except Exception as e:
+                    print(f"Error uploading photo: {e}")
+                    continue
 
-        db.session.commit()
+            db.session.commit()
+        listing_changed(listing.id, old_type_object, listing.type_object)
         flash("Advertentie bijgewerkt.", "success")
-        return redirect(url_for("property_detail", property_id=listing.id))
+        return redirect(url_for("main.property_detail", property_id=listing.id))
 
     return render_template("edit_property.html", property=listing)
 
@@ -624,7 +1037,7 @@ def edit_property(property_id):
 # --------------------------------------------------
 
 
-@app.route("/property/<int:property_id>/delete", methods=["POST"])
+@bp.route("/property/<int:property_id>/delete", methods=["POST"])
 def delete_property(property_id):
     listing = db.session.get(Property, property_id)
     if not listing:
@@ -633,145 +1046,350 @@ def delete_property(property_id):
     if listing.user_id != get_current_user_id():
         abort(403)
 
-    # Delete all associated images from filesystem
+    # Delete all associated images from filesystem, after the commit
     for image in listing.images:
-        path = os.path.join(app.static_folder, image.image_path)
-        if os.path.exists(path):
-            try:
-                os.remove(path)
-            except Exception as e:
-                print(f"Error deleting file {path}: {e}")
+        enqueue_file_release(image)
+
+    type_object = listing.type_object
 
     db.session.delete(listing)
     db.session.commit()
+    listing_changed(property_id, type_object)
 
     flash("Advertentie verwijderd.", "info")
-    return redirect(url_for("dashboard"))
+    return redirect(url_for("main.dashboard"))
 
 
 # --------------------------------------------------
-# DELETE IMAGE
+# MANAGE IMAGES
 # --------------------------------------------------
 
 
-@app.route("/property/image/<int:image_id>/delete", methods=["POST"])
-def delete_property_image(image_id):
-    image = db.session.get(PropertyImage, image_id)
-    if not image:
-        return jsonify({"success": False, "error": "Image not found"}), 404
+def checked_image_id(value, image_ids):
+    """The image id in an operation, which must be one of ``image_ids``."""
+    image_id = int(value)
+    if image_id not in image_ids:
+        raise ValueError(f"Unknown image {image_id}")
+    return image_id
+
+
+@bp.route("/property/<int:property_id>/images", methods=["POST"])
+@query_budget(8)
+def manage_images(property_id):
+    """Apply a batch of photo operations in one transaction.
+
+    Expects ``{"operations": [...]}``, applied in order, with entries like
+    ``{"op": "reorder", "order": [id, ...]}``, ``{"op": "set_primary",
+    "id": id}`` or ``{"op": "delete", "id": id}``. Returns the photos as
+    they are afterwards.
+    """
+    listing = db.session.get(Property, property_id)
+    if not listing:
+        return jsonify({"success": False, "error": "Property not found"}), 404
 
-    # Check ownership
-    if image.property.user_id != get_current_user_id():
+    if listing.user_id != get_current_user_id():
         return jsonify({"success": False, "error": "Unauthorized"}), 403
 
-    property_id = image.property_id
-    was_primary = image.is_primary
+    data = request.get_json(silent=True)
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if (
+        not isinstance(operations, list)
+        or not operations
+        or not all(isinstance(operation, dict) for operation in operations)
+    ):
+        return jsonify({"success": False, "error": "Invalid data"}), 400
 
-    # Delete file
-    path = os.path.join(app.static_folder, image.image_path)
-    if os.path.exists(path):
-        try:
-            os.remove(path)
-        except Exception as e:
-            print(f"Error deleting file: {e}")
+    images = {
+        image.id: image
+        for image in PropertyImage.query.filter_by(property_id=listing.id)
+    }
 
-    db.session.delete(image)
-    db.session.commit()
+    # Work out the final state first: image_id -> sort_order, plus the primary
+    sort_orders = {
+        image_id: image.sort_order or 0 for image_id, image in images.items()
+    }
+    primary_id = next((i for i, image in images.items() if image.is_primary), None)
 
-    new_primary_id = None
+    try:
+        for operation in operations:
+            op = operation.get("op")
+            if op == "reorder":
+                # Listed photos go first, in the given order; the rest keep
+                # their relative order behind them
+                order = operation["order"]
+                if not isinstance(order, list):
+                    raise TypeError("order must be a list")
+                listed = [checked_image_id(i, sort_orders) for i in order]
+                rest = sorted(
+                    (i for i in sort_orders if i not in listed),
+                    key=lambda i: (sort_orders[i], i),
+                )
+                for position, image_id in enumerate(dict.fromkeys(listed + rest)):
+                    sort_orders[image_id] = position
+            elif op == "set_primary":
+                primary_id = checked_image_id(operation["id"], sort_orders)
+            elif op == "delete":
+                image_id = checked_image_id(operation["id"], sort_orders)
+                del sort_orders[image_id]
+                if primary_id == image_id:
+                    primary_id = None
+            else:
+                raise ValueError(f"Unknown operation {op!r}")
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid operation"}), 400
+
+    if primary_id is None and sort_orders:
+        primary_id = min(sort_orders, key=lambda i: (sort_orders[i], i))
+
+    # Then write it with one set-based statement per kind of change. The
+    # loaded images are not used afterwards, so skip synchronizing them.
+    deleted = [i for i in images if i not in sort_orders]
+    moved = {i: s for i, s in sort_orders.items() if s != images[i].sort_order}
+    primary_changed = any(
+        bool(images[i].is_primary) != (i == primary_id) for i in sort_orders
+    )
 
-    # Set new primary if needed
-    if was_primary:
-        next_image = (
-            PropertyImage.query.filter_by(property_id=property_id)
-            .order_by(PropertyImage.sort_order.asc())
-            .first()
+    for image_id in deleted:
+        enqueue_file_release(images[image_id])
+    if deleted:
+        db.session.execute(
+            db.delete(PropertyImage)
+            .where(PropertyImage.id.in_(deleted))
+            .execution_options(synchronize_session=False)
+        )
+    if moved:
+        db.session.execute(
+            db.update(PropertyImage)
+            .where(PropertyImage.id.in_(moved))
+            .values(sort_order=db.case(moved, value=PropertyImage.id))
+            .execution_options(synchronize_session=False)
+        )
+    if primary_changed:
+        db.session.execute(
+            db.update(PropertyImage)
+            .where(PropertyImage.property_id == listing.id)
+            .values(is_primary=PropertyImage.id == primary_id)
+            .execution_options(synchronize_session=False)
         )
-        if next_image:
-            next_image.is_primary = True
-            db.session.commit()
-            new_primary_id = next_image.id
 
-    return jsonify({"success": True, "new_primary_id": new_primary_id})
+    if deleted or moved or primary_changed:
+        type_object = listing.type_object
+        listing.touch()
+        db.session.commit()
+        listing_changed(property_id, type_object)
+
+    return jsonify(
+        {
+            "success": True,
+            "primary_id": primary_id,
+            "images": [
+                {"id": i, "sort_order": s, "is_primary": i == primary_id}
+                for i, s in sorted(sort_orders.items(), key=lambda item: item[::-1])
+            ],
+        }
+    )
 
 
 # --------------------------------------------------
-# SET PRIMARY IMAGE
+# TOGGLE STATUS
 # --------------------------------------------------
 
 
-@app.route("/property/image/<int:image_id>/set-primary", methods=["POST"])
-def set_primary_image(image_id):
-    image = db.session.get(PropertyImage, image_id)
-    if not image:
-        return jsonify({"success": False}), 404
+@bp.route("/property/<int:property_id>/toggle_status", methods=["POST"])
+def toggle_status(property_id):
+    listing = db.session.get(Property, property_id)
+    if not listing:
+        abort(404)
 
-    if image.property.user_id != get_current_user_id():
-        return jsonify({"success": False, "error": "Unauthorized"}), 403
+    if listing.user_id != get_current_user_id():
+        abort(403)
 
-    # Remove primary from all images of this property
-    PropertyImage.query.filter_by(property_id=image.property_id).update(
-        {"is_primary": False}
-    )
+    status_map = {
+        "te koop": "verkocht",
+        "verkocht": "te koop",
+        "te huur": "verhuurd",
+        "verhuurd": "te huur",
+    }
 
-    image.is_primary = True
+    listing.status = status_map.get(listing.status, listing.status)
     db.session.commit()
+    listing_changed(listing.id, listing.type_object)
 
-    return jsonify({"success": True, "image_id": image.id})
+    flash("Status aangepast.", "success")
+    return redirect(url_for("main.dashboard"))
 
 
 # --------------------------------------------------
-# REORDER IMAGES
+# BACKGROUND JOBS
 # --------------------------------------------------
 
 
-@app.route("/property/image/reorder", methods=["POST"])
-def reorder_images():
-    data = request.get_json()
-    if not data or "order" not in data:
-        return jsonify({"success": False, "error": "Invalid data"}), 400
-
-    order = data.get("order", [])
+@handler("process_image")
+def process_image(image_id):
+    image = db.session.get(PropertyImage, image_id)
+    if image is None or image.variants is not None:
+        return  # deleted meanwhile, or already processed
+
+    # The same photo was uploaded before: its variants are already on disk
+    if image.content_hash:
+        twin = PropertyImage.query.filter(
+            PropertyImage.content_hash == image.content_hash,
+            PropertyImage.image_path == image.image_path,
+            PropertyImage.variants.isnot(None),
+        ).first()
+        if twin is not None:
+            image.variants = twin.variants
+            db.session.commit()
+            listing_changed(image.property_id, image.property.type_object)
+            return
 
     try:
-        for item in order:
-            img = db.session.get(PropertyImage, int(item["id"]))
-            if img and img.property.user_id == get_current_user_id():
-                img.sort_order = item["sort_order"]
+        with IMAGE_PROCESSING_SECONDS.time():
+            image.variants = generate_variants(
+                current_app.static_folder, image.image_path
+            )
+    except FileNotFoundError:
+        return
+    except (OSError, Image.DecompressionBombError) as e:
+        # Not a decodable image: keep serving the original, don't retry
+        print(f"Error creating variants for {image.image_path}: {e}")
+        image.variants = {}
+    db.session.commit()
+    listing_changed(image.property_id, image.property.type_object)
 
-        db.session.commit()
-        return jsonify({"success": True})
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"success": False, "error": str(e)}), 500
+
+@handler("delete_files")
+def delete_files_job(paths, content_hash=None):
+    if not content_hash:
+        delete_files(current_app.static_folder, paths)
+        return
+
+    # An upload of the same photo holds the lock until its row is committed
+    with photo_lock(current_app.static_folder, content_hash):
+        references = PropertyImage.query.filter_by(
+            content_hash=content_hash, image_path=paths[0]
+        ).count()
+        if references:
+            return  # still used by another photo
+        delete_files(current_app.static_folder, paths)
 
 
 # --------------------------------------------------
-# TOGGLE STATUS
+# CLI
 # --------------------------------------------------
 
 
-@app.route("/property/<int:property_id>/toggle_status", methods=["POST"])
-def toggle_status(property_id):
-    listing = db.session.get(Property, property_id)
-    if not listing:
-        abort(404)
+@bp.cli.command("jobs-work")
+@click.option("--threads", default=2, show_default=True)
+@click.option("--burst", is_flag=True, help="Stop when the queue is empty.")
+def jobs_work(threads, burst):
+    """Run background jobs in the foreground."""
+    workers = [
+        threading.Thread(
+            target=work,
+            args=(current_app._get_current_object(),),
+            kwargs={"burst": burst},
+        )
+        for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+@bp.cli.command("search-reindex")
+def search_reindex():
+    """Rebuild the full-text search index for all listings."""
+    with db.engine.begin() as conn:
+        total = reindex_properties(conn)
+    print(f"✅ {total} advertenties geïndexeerd.")
+
+
+@bp.cli.command("assets-build")
+def assets_build():
+    """Write fingerprinted, precompressed CSS/JS to static/dist."""
+    manifest = build_assets(current_app.static_folder)
+    print(f"✅ {len(manifest)} bestanden gebouwd in static/{DIST_DIR}.")
+
+
+@bp.cli.command("rates-set")
+@click.argument("valuta")
+@click.argument("srd_per_unit", type=float)
+def rates_set(valuta, srd_per_unit):
+    """Set the exchange rate of a currency (SRD per unit) and reprice listings."""
+    valuta = valuta.upper()
+    if valuta == BASE_CURRENCY:
+        raise click.BadParameter(f"{BASE_CURRENCY} is de basisvaluta.")
+    with db.engine.begin() as conn:
+        total = set_rate(conn, valuta, srd_per_unit)
+    page_cache.invalidate(["listings:all", "listings:huis", "listings:perceel"])
+    print(f"✅ 1 {valuta} = {srd_per_unit} SRD, {total} advertenties herberekend.")
+
+
+@bp.cli.command("listings-import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user", "email", required=True, help="E-mail of the owner.")
+@click.option(
+    "--photos",
+    "photo_dir",
+    type=click.Path(exists=True, file_okay=False),
+    help="Folder the paths in the 'fotos' column are relative to.",
+)
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]))
+@click.option("--batch-size", default=IMPORT_BATCH_SIZE, show_default=True)
+@click.option("--workers", default=PHOTO_WORKERS, show_default=True)
+def listings_import(path, email, photo_dir, fmt, batch_size, workers):
+    """Import listings (and their photos) from a CSV or JSONL file."""
+    fmt = fmt or file_format(path)
+    if fmt is None:
+        raise click.BadParameter("Gebruik .csv of .jsonl, of geef --format op.")
+    user = User.query.filter_by(email=email.strip()).first()
+    if user is None:
+        raise click.BadParameter(f"Geen gebruiker met e-mail {email}.")
+
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        report = import_listings(
+            stream,
+            fmt,
+            user.id,
+            current_app.static_folder,
+            MAX_PHOTOS_PER_PROPERTY,
+            photo_dir=photo_dir,
+            batch_size=max(batch_size, 1),
+            workers=max(workers, 1),
+        )
 
-    if listing.user_id != get_current_user_id():
-        abort(403)
+    page_cache.invalidate(["listings:all", "listings:huis", "listings:perceel"])
+    for line_number, message in report.errors:
+        print(f"⚠️ regel {line_number}: {message}")
+    print(
+        f"✅ {report.imported} advertenties en {report.photos} foto's "
+        f"geïmporteerd, {len(report.errors)} regels overgeslagen."
+    )
 
-    status_map = {
-        "te koop": "verkocht",
-        "verkocht": "te koop",
-        "te huur": "verhuurd",
-        "verhuurd": "te huur",
-    }
 
-    listing.status = status_map.get(listing.status, listing.status)
+@bp.cli.command("listings-export")
+@click.argument("path")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]))
+def listings_export(path, fmt):
+    """Write all listings to a CSV or JSONL file ('-' for stdout)."""
+    fmt = fmt or file_format(path)
+    if fmt is None:
+        raise click.BadParameter("Gebruik .csv of .jsonl, of geef --format op.")
+    with click.open_file(path, "w", encoding="utf-8") as stream:
+        total = export_listings(stream, fmt)
+    click.echo(f"✅ {total} advertenties geëxporteerd.", err=True)
+
+
+@bp.cli.command("images-rebuild")
+def images_rebuild():
+    """Queue variant generation for photos that have none yet."""
+    images = PropertyImage.query.filter(PropertyImage.variants.is_(None)).all()
+    for image in images:
+        enqueue_image_processing(image)
     db.session.commit()
-
-    flash("Status aangepast.", "success")
-    return redirect(url_for("dashboard"))
+    print(f"✅ {len(images)} foto's in de wachtrij, verwerk met 'flask jobs-work'.")
 
 
 # --------------------------------------------------
@@ -779,21 +1397,24 @@ def toggle_status(property_id):
 # --------------------------------------------------
 
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(e):
     return render_template("404.html"), 404
 
 
-@app.errorhandler(403)
+@bp.app_errorhandler(403)
 def forbidden(e):
     flash("Je hebt geen toegang tot deze pagina.", "danger")
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 
-@app.errorhandler(413)
+@bp.app_errorhandler(413)
 def request_entity_too_large(e):
     flash("Bestanden zijn te groot. Maximaal 16MB toegestaan.", "danger")
-    return redirect(request.referrer or url_for("home"))
+    return redirect(request.referrer or url_for("main.home"))
+
+
+app = create_app()
 
 
 # --------------------------------------------------
@@ -0,0 +1,77 @@
+"""
+Land and living area in square metres.
+
+Owners enter ``perceel_oppervlakte`` / ``woon_oppervlakte`` with a unit
+(``perceel_eenheid`` / ``woon_eenheid``: m2 or hectare). For filtering and
+sorting, ``perceel_m2`` and ``woon_m2`` hold the same areas converted to m²;
+they are set whenever a listing is written.
+
+The *main* area is what a price per m² refers to: the land for a perceel,
+the living area for a house (or its land if that is all that is known).
+``prijs_per_m2`` itself is maintained by currency.py, as it depends on the
+exchange rate.
+"""
+
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from models import Property
+
+# Unit spellings seen in the data -> square metres per unit
+UNIT_FACTORS = {
+    "m2": 1,
+    "m²": 1,
+    "ha": 10_000,
+    "hectare": 10_000,
+}
+DEFAULT_UNIT = "m2"
+
+AREA_FIELDS = {
+    "perceel_m2": ("perceel_oppervlakte", "perceel_eenheid"),
+    "woon_m2": ("woon_oppervlakte", "woon_eenheid"),
+}
+
+
+def to_m2(value, unit):
+    """Area in m², or None if it is missing or the unit is unknown."""
+    if value is None or value <= 0:
+        return None
+    factor = UNIT_FACTORS.get((unit or "").strip().lower() or DEFAULT_UNIT)
+    if factor is None:
+        return None
+    return value * factor
+
+
+def main_area_m2(listing):
+    """The area a listing's price per m² refers to, from its raw fields."""
+    perceel_m2 = to_m2(listing.perceel_oppervlakte, listing.perceel_eenheid)
+    if listing.type_object == "perceel":
+        return perceel_m2
+    return to_m2(listing.woon_oppervlakte, listing.woon_eenheid) or perceel_m2
+
+
+def main_area_expression(table):
+    """SQL version of ``main_area_m2`` over the normalized columns."""
+    return sa.case(
+        (table.c.type_object == "perceel", table.c.perceel_m2),
+        else_=sa.func.coalesce(table.c.woon_m2, table.c.perceel_m2),
+    )
+
+
+def area_fields_changed(target):
+    state = sa.inspect(target)
+    return any(
+        state.attrs[name].history.has_changes()
+        for fields in AREA_FIELDS.values()
+        for name in fields
+    )
+
+
+@event.listens_for(Property, "before_insert")
+@event.listens_for(Property, "before_update")
+def _update_area_columns(mapper, connection, target):
+    if target.id is None or area_fields_changed(target):
+        for column, (value, unit) in AREA_FIELDS.items():
+            setattr(
+                target, column, to_m2(getattr(target, value), getattr(target, unit))
+            )
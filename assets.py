@@ -0,0 +1,127 @@
+"""
+Fingerprinted, precompressed CSS and JavaScript.
+
+``flask assets-build`` copies every file in ``static/css`` and ``static/js``
+to ``static/dist/`` under a content-hashed name (``js/forms.3f9c0a1b2d.js``)
+and writes a gzip and (if the ``brotli`` package is installed) a brotli
+version next to it. ``static/dist/manifest.json`` maps the source name to
+the built one.
+
+Templates keep calling ``url_for('static', filename='js/forms.js')``; once a
+manifest exists the URL points at the fingerprinted file. Those are served
+precompressed when the browser accepts it, with a one-year ``immutable``
+Cache-Control: a changed file gets a new name, so it never needs
+revalidating. Without a manifest (or in debug mode) the plain files are used.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip versions are built
+    brotli = None
+
+SOURCE_DIRS = ("css", "js")
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+HASH_LENGTH = 10
+MAX_AGE = 365 * 24 * 60 * 60
+
+# Content-Encoding -> suffix of the precompressed file, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def build_assets(static_folder):
+    """Write fingerprinted and compressed copies of the assets.
+
+    Returns the new manifest. Files of earlier builds are removed.
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        source_folder = os.path.join(static_folder, source_dir)
+        if not os.path.isdir(source_folder):
+            continue
+        os.makedirs(os.path.join(dist_folder, source_dir))
+
+        for name in sorted(os.listdir(source_folder)):
+            with open(os.path.join(source_folder, name), "rb") as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(name)
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            built = f"{DIST_DIR}/{source_dir}/{stem}.{digest}{ext}"
+            target = os.path.join(static_folder, *built.split("/"))
+
+            with open(target, "wb") as f:
+                f.write(data)
+            with open(target + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + ".br", "wb") as f:
+                    f.write(brotli.compress(data, mode=brotli.MODE_TEXT))
+
+            manifest[f"{source_dir}/{name}"] = built
+
+    with open(os.path.join(dist_folder, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Assets:
+    def __init__(self):
+        self.manifest = {}
+
+    def init_app(self, app):
+        try:
+            with open(os.path.join(app.static_folder, DIST_DIR, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+        app.url_defaults(self.fingerprint)
+        app.view_functions["static"] = self.serve(app.view_functions["static"])
+
+    def fingerprint(self, endpoint, values):
+        """``url_defaults`` hook: point static URLs at the built files."""
+        if endpoint != "static" or current_app.debug:
+            return
+        built = self.manifest.get(values.get("filename"))
+        if built:
+            values["filename"] = built
+
+    def serve(self, static_view):
+        def static(filename):
+            if not filename.startswith(f"{DIST_DIR}/"):
+                return static_view(filename=filename)
+
+            mimetype = mimetypes.guess_type(filename)[0]
+            folder = current_app.static_folder
+            for encoding, suffix in ENCODINGS:
+                if encoding in request.accept_encodings and os.path.isfile(
+                    os.path.join(folder, *(filename + suffix).split("/"))
+                ):
+                    response = send_from_directory(
+                        folder, filename + suffix, mimetype=mimetype, max_age=MAX_AGE
+                    )
+                    response.content_encoding = encoding
+                    break
+            else:
+                response = send_from_directory(
+                    folder, filename, mimetype=mimetype, max_age=MAX_AGE
+                )
+
+            response.vary.add("Accept-Encoding")
+            response.cache_control.immutable = True
+            return response
+
+        return static
@@ -0,0 +1,382 @@
+"""
+Bulk import and export of listings (``flask listings-import`` / ``-export``).
+
+Files are CSV or JSON Lines with one listing per row and the columns of
+``IMPORT_FIELDS``. ``fotos`` holds photo paths relative to a photo folder,
+separated by ``;`` in CSV or as a list in JSONL; the first one becomes the
+primary photo. An export lists the stored photos relative to the static
+folder, so ``--photos static`` imports it again.
+
+Rows are checked with the same rules as ``add_property`` (listing_form.py);
+rejected rows are reported by line number and skipped. The rest is written
+per batch in a single transaction each:
+
+- photos are stored and resized by a pool of worker threads (Pillow and
+  hashlib release the GIL), so no ``process_image`` jobs are queued;
+- listings go in with one COPY on PostgreSQL (ids reserved from the
+  sequence first) or one batched INSERT .. RETURNING elsewhere, with the
+  derived columns the ORM events would set (prices in SRD, areas in m²,
+  coordinates) computed here;
+- photo rows go in with one executemany, and the search index with one more.
+
+The export streams listings with ``yield_per`` and their photos with one
+``selectin`` query per chunk, so memory use does not grow with the table.
+"""
+
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from types import SimpleNamespace
+
+import sqlalchemy as sa
+from PIL import Image
+from sqlalchemy.orm import selectinload
+from werkzeug.datastructures import FileStorage
+
+from areas import AREA_FIELDS, main_area_m2, to_m2
+from geo import listing_coordinates
+from images import (
+    allowed_file,
+    files_exist,
+    generate_variants,
+    image_files,
+    photo_lock,
+    save_photo,
+)
+from listing_form import ListingError, parse_listing
+from models import ExchangeRate, Property, PropertyImage, db
+from search import index_properties
+
+IMPORT_FIELDS = (
+    "titel",
+    "type_object",
+    "status",
+    "prijs",
+    "valuta",
+    "grondrecht",
+    "perceel_oppervlakte",
+    "perceel_eenheid",
+    "woon_oppervlakte",
+    "woon_eenheid",
+    "district",
+    "wijk",
+    "latitude",
+    "longitude",
+    "beschrijving",
+    "fotos",
+)
+EXPORT_FIELDS = ("id",) + IMPORT_FIELDS
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+PHOTO_SEPARATOR = ";"
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+PHOTO_WORKERS = 4
+
+
+def file_format(path):
+    """``csv`` or ``jsonl``, from the file extension (None if unknown)."""
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+# --------------------------------------------------
+# READING
+# --------------------------------------------------
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row, error)``; ``row`` is None if unreadable."""
+    if fmt == "csv":
+        # Line 1 is the header
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, row, None
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Ongeldige JSON."
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Verwacht een JSON-object per regel."
+            continue
+        yield line_number, row, None
+
+
+def photo_paths(row):
+    photos = row.get("fotos") or []
+    if isinstance(photos, str):
+        photos = photos.split(PHOTO_SEPARATOR)
+    return [str(photo).strip() for photo in photos if str(photo).strip()]
+
+
+def resolve_photo(photo_dir, relative_path):
+    """Absolute path of a photo inside ``photo_dir``, or None."""
+    if photo_dir is None:
+        return None
+    base = os.path.realpath(photo_dir)
+    path = os.path.realpath(os.path.join(base, relative_path))
+    if not path.startswith(base + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+# --------------------------------------------------
+# IMPORT
+# --------------------------------------------------
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.photos = 0
+        self.errors = []  # (line_number, message)
+
+
+def _validate(row, photo_dir, max_photos):
+    """Property fields and photo files of a row; raises ListingError."""
+    fields = parse_listing(row)
+
+    relative_paths = photo_paths(row)
+    if len(relative_paths) > max_photos:
+        raise ListingError(f"Je mag maximaal {max_photos} foto's uploaden.")
+    photos = []
+    for relative_path in relative_paths:
+        if not allowed_file(relative_path):
+            raise ListingError(f"Ongeldig bestandstype: {relative_path}")
+        path = resolve_photo(photo_dir, relative_path)
+        if path is None:
+            raise ListingError(f"Foto niet gevonden: {relative_path}")
+        photos.append(path)
+    return fields, photos
+
+
+def _ingest_photo(path, static_folder):
+    """Store a photo file and its variants, as an upload plus its job would."""
+    with open(path, "rb") as f:
+        photo = FileStorage(stream=f, filename=os.path.basename(path))
+        image_path, content_hash = save_photo(photo, static_folder)
+
+    try:
+        variants = generate_variants(static_folder, image_path)
+    except (OSError, Image.DecompressionBombError) as e:
+        # Not a decodable image: keep serving the original
+        print(f"Error creating variants for {image_path}: {e}")
+        variants = {}
+    return image_path, content_hash, variants
+
+
+def _derived_columns(fields, rates):
+    """What the mapper events of areas.py, currency.py and geo.py set."""
+    values = {
+        column: to_m2(fields[value], fields[unit])
+        for column, (value, unit) in AREA_FIELDS.items()
+    }
+    values["latitude"], values["longitude"], values["geohash"] = listing_coordinates(
+        fields
+    )
+    rate = rates.get(fields["valuta"])
+    prijs_srd = fields["prijs"] * rate if rate is not None else None
+    area = main_area_m2(SimpleNamespace(**fields))
+    values["prijs_srd"] = prijs_srd
+    values["prijs_per_m2"] = (
+        prijs_srd / area if prijs_srd is not None and area else None
+    )
+    return values
+
+
+def _insert_properties(connection, rows):
+    """Insert listing rows (dicts with the same keys); returns their ids."""
+    table = Property.__table__
+
+    if (
+        connection.dialect.name == "postgresql"
+        and connection.dialect.driver == "psycopg"
+    ):
+        ids = (
+            connection.execute(
+                sa.text(
+                    "SELECT nextval(pg_get_serial_sequence('property', 'id')) "
+                    "FROM generate_series(1, :n)"
+                ),
+                {"n": len(rows)},
+            )
+            .scalars()
+            .all()
+        )
+        columns = ", ".join(["id", *rows[0]])
+        with connection.connection.cursor() as cursor:
+            with cursor.copy(f"COPY property ({columns}) FROM STDIN") as copy:
+                for id_, row in zip(ids, rows):
+                    copy.write_row((id_, *row.values()))
+        return ids
+
+    return (
+        connection.execute(
+            table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+        )
+        .scalars()
+        .all()
+    )
+
+
+def _import_batch(batch, report, user_id, static_folder, photo_dir, pool, max_photos):
+    valid = []
+    for line_number, row, error in batch:
+        if error is None:
+            try:
+                valid.append((line_number, *_validate(row, photo_dir, max_photos)))
+                continue
+            except ListingError as e:
+                error = str(e)
+        report.errors.append((line_number, error))
+
+    # The same file listed twice is stored once
+    ingested = {}
+    for _, _, photos in valid:
+        for path in photos:
+            if path not in ingested:
+                ingested[path] = pool.submit(_ingest_photo, path, static_folder)
+
+    listings = []
+    for line_number, fields, photos in valid:
+        try:
+            stored = [ingested[path].result() for path in photos]
+        except (OSError, Image.DecompressionBombError) as e:
+            report.errors.append((line_number, f"Foto kon niet worden gelezen: {e}"))
+            continue
+        listings.append((fields, stored))
+    if not listings:
+        return
+
+    connection = db.session.connection()
+    rates = dict(
+        connection.execute(
+            sa.select(ExchangeRate.valuta, ExchangeRate.srd_per_unit)
+        ).all()
+    )
+    now = datetime.utcnow()
+    ids = _insert_properties(
+        connection,
+        [
+            {
+                **fields,
+                **_derived_columns(fields, rates),
+                "user_id": user_id,
+                "updated_at": now,
+            }
+            for fields, _ in listings
+        ],
+    )
+
+    image_rows = [
+        {
+            "property_id": property_id,
+            "image_path": image_path,
+            "content_hash": content_hash,
+            "variants": variants,
+            "is_primary": idx == 0,
+            "sort_order": idx,
+        }
+        for property_id, (_, stored) in zip(ids, listings)
+        for idx, (image_path, content_hash, variants) in enumerate(stored)
+    ]
+    if image_rows:
+        connection.execute(PropertyImage.__table__.insert(), image_rows)
+
+    index_properties(
+        connection,
+        [
+            (property_id, fields["titel"], fields["beschrijving"])
+            for property_id, (fields, _) in zip(ids, listings)
+        ],
+    )
+    db.session.commit()
+    _restore_released(ingested, image_rows, static_folder)
+
+    report.imported += len(ids)
+    report.photos += len(image_rows)
+
+
+def _restore_released(ingested, image_rows, static_folder):
+    """Store again the photos a ``delete_files`` job removed during the batch.
+
+    The photos are written without ``photo_lock``, so the release of an older
+    copy can unlink them before the batch is committed. Once it is, a release
+    counts the new rows; the lock waits for one already counting.
+    """
+    imported = {row["image_path"]: row for row in image_rows}
+    for path, future in ingested.items():
+        if future.exception() is not None:
+            continue
+        image_path, content_hash, _ = future.result()
+        row = imported.get(image_path)
+        if row is None:
+            continue
+        with photo_lock(static_folder, content_hash):
+            released = not files_exist(
+                static_folder, image_files(SimpleNamespace(**row))
+            )
+        if released:
+            _ingest_photo(path, static_folder)
+
+
+def import_listings(
+    stream,
+    fmt,
+    user_id,
+    static_folder,
+    max_photos,
+    photo_dir=None,
+    batch_size=IMPORT_BATCH_SIZE,
+    workers=PHOTO_WORKERS,
+):
+    """Import the listings in ``stream`` for ``user_id``; returns a report."""
+    report = ImportReport()
+    rows = read_rows(stream, fmt)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while batch := list(islice(rows, batch_size)):
+            _import_batch(
+                batch, report, user_id, static_folder, photo_dir, pool, max_photos
+            )
+    return report
+
+
+# --------------------------------------------------
+# EXPORT
+# --------------------------------------------------
+
+
+def export_listings(stream, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """Write every listing to ``stream``; returns the number written."""
+    query = (
+        Property.query.options(selectinload(Property.images))
+        .order_by(Property.id)
+        .yield_per(batch_size)
+    )
+
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, EXPORT_FIELDS)
+        writer.writeheader()
+
+    total = 0
+    for listing in query:
+        row = {
+            name: getattr(listing, name) for name in EXPORT_FIELDS if name != "fotos"
+        }
+        photos = [image.image_path for image in listing.images]
+        if writer is not None:
+            writer.writerow({**row, "fotos": PHOTO_SEPARATOR.join(photos)})
+        else:
+            stream.write(json.dumps({**row, "fotos": photos}, ensure_ascii=False))
+            stream.write("\n")
+        total += 1
+    return total
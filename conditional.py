@@ -0,0 +1,81 @@
+"""
+Conditional GET (ETag / Last-Modified) for pages built from listings.
+
+A view declares a cheap *validator*: a query that returns when the data
+behind the page last changed, without rendering anything. If the client's
+copy is still current it gets a ``304 Not Modified``; otherwise the view
+runs and its response carries the validators for the next revisit.
+
+The ETag also covers the endpoint, the query args and who is logged in, as
+the navigation bar differs per visitor. ``ETAG_VERSION`` (set to the
+deployed commit) changes every ETag when the templates change.
+"""
+
+import functools
+import hashlib
+
+from flask import current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+
+def make_etag(last_modified, parts):
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if v)
+    raw = repr(
+        (
+            current_app.config.get("ETAG_VERSION", ""),
+            request.endpoint,
+            sorted(request.view_args.items()),
+            args,
+            session.get("user_id"),
+            last_modified.isoformat() if last_modified else None,
+            parts,
+        )
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional(validator):
+    """Answer conditional GETs for a view.
+
+    ``validator(**view_args)`` returns ``(last_modified, *parts)``: the time
+    of the newest change (naive UTC, may be None) plus anything else that
+    identifies the content, e.g. the number of matches. It returns None if
+    the page can't be validated; the view then runs as usual.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            # Pending flash messages are shown once, never answer with a 304
+            if request.method != "GET" or session.get("_flashes"):
+                return view(**view_args)
+
+            state = validator(**view_args)
+            if state is None:
+                return view(**view_args)
+
+            last_modified, *parts = state
+            etag = make_etag(last_modified, parts)
+
+            if not is_resource_modified(
+                request.environ, etag=etag, last_modified=last_modified
+            ):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(**view_args))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            # Cacheable, but always revalidated
+            response.cache_control.no_cache = True
+            if session.get("user_id"):
+                response.cache_control.private = True
+            response.vary.add("Cookie")
+            return response
+
+        return wrapper
+
+    return decorator
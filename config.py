@@ -0,0 +1,119 @@
+"""
+Configuration profiles for ``create_app``.
+
+The profile is picked with ``APP_CONFIG`` (development, production or
+testing; development if unset). Settings come from the environment:
+
+- ``DATABASE_URL``: ``postgres://`` and ``postgresql://`` URLs use psycopg 3
+- ``DB_POOL_SIZE`` / ``DB_MAX_OVERFLOW``: connections per web worker process
+  kept open / opened on top of that under load. With gunicorn's threaded
+  workers a request thread holds one while it runs, so the pool should be
+  about ``threads`` plus the job worker threads; times the number of
+  workers it must stay below the database's connection limit
+- ``DB_POOL_TIMEOUT``: seconds a request waits for a free connection
+- ``DB_POOL_RECYCLE``: seconds after which a connection is replaced, before
+  the server or a proxy closes it for being idle
+- ``DB_STATEMENT_TIMEOUT_MS``: PostgreSQL cancels statements running longer
+- ``METRICS_TOKEN``: bearer token for ``/metrics``; without one production
+  doesn't serve the metrics at all
+"""
+
+import os
+
+from sqlalchemy.engine import make_url
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _int_env(name, default):
+    return int(os.environ.get(name, default))
+
+
+def database_url(url):
+    """``url`` with the psycopg 3 driver for PostgreSQL."""
+    parsed = make_url(url)
+    if parsed.drivername in ("postgres", "postgresql"):
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    return parsed.render_as_string(hide_password=False)
+
+
+def engine_options(config):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for the configured database."""
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        # Wait this long for another connection's write lock
+        return {"connect_args": {"timeout": 15}}
+
+    options = {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        # A connection the server dropped is replaced instead of failing a request
+        "pool_pre_ping": True,
+    }
+    if url.get_backend_name() == "postgresql":
+        connect_args = {"connect_timeout": 10}
+        if config["DB_STATEMENT_TIMEOUT_MS"]:
+            connect_args["options"] = (
+                f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+            )
+        options["connect_args"] = connect_args
+    return options
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
+    SQLALCHEMY_DATABASE_URI = database_url(
+        os.environ.get("DATABASE_URL", "sqlite:///realestate.db")
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    DB_POOL_SIZE = _int_env("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW = _int_env("DB_MAX_OVERFLOW", 5)
+    DB_POOL_TIMEOUT = _int_env("DB_POOL_TIMEOUT", 10)
+    DB_POOL_RECYCLE = _int_env("DB_POOL_RECYCLE", 1800)
+    DB_STATEMENT_TIMEOUT_MS = _int_env("DB_STATEMENT_TIMEOUT_MS", 30000)
+
+    UPLOAD_FOLDER = os.path.join(BASE_DIR, "static", "uploads")
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    # Part of every ETag, so a deploy with new templates invalidates them
+    ETAG_VERSION = os.environ.get("RENDER_GIT_COMMIT", "")
+    # Proxies in front that set X-Forwarded-For (0: none, don't trust it)
+    TRUSTED_PROXIES = _int_env("TRUSTED_PROXIES", 0)
+    JOB_WORKER_THREADS = _int_env("JOB_WORKER_THREADS", 2)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    METRICS_TOKEN_REQUIRED = False
+
+
+class DevelopmentConfig(Config):
+    TEMPLATES_AUTO_RELOAD = True
+
+
+class ProductionConfig(Config):
+    PREFERRED_URL_SCHEME = "https"
+    METRICS_TOKEN_REQUIRED = True
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    JOB_WORKER_THREADS = 0
+    PASSWORD_HASH_WORKERS = 0
+    # Fail on a page that goes over its query budget instead of logging it
+    SQL_QUERY_BUDGET_STRICT = True
+
+
+PROFILES = {
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+    "testing": TestingConfig,
+}
+
+
+def load_config(name=None):
+    name = name or os.environ.get("APP_CONFIG", "development")
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown APP_CONFIG {name!r}") from None
@@ -0,0 +1,110 @@
+"""
+Prices across currencies.
+
+A listing keeps its asking price in its own currency (``prijs`` + ``valuta``).
+``property.prijs_srd`` holds the same price converted to SRD at the rate in
+the ``exchange_rate`` table. It is indexed, so a price filter or price sort
+is one range scan over all listings, whatever currency they are in.
+
+``prijs_per_m2`` is the SRD price divided by the listing's main area (see
+areas.py), for price-per-m² filters and sorting.
+
+Both are computed in SQL whenever a listing is written, and recomputed in
+bulk (one UPDATE per currency) when a rate changes through
+``flask rates-set``.
+"""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from areas import area_fields_changed, main_area_expression, main_area_m2
+from models import ExchangeRate, Property
+
+BASE_CURRENCY = "SRD"
+
+# Rates a fresh database starts with (SRD per unit)
+INITIAL_RATES = {"SRD": 1.0, "USD": 36.5, "EUR": 39.5}
+
+
+def price_in_srd(amount, valuta):
+    """SQL expression for ``amount`` in ``valuta``, converted to SRD.
+
+    The rate is read in a scalar subquery, so no separate round trip is
+    needed and the comparison still uses the ``prijs_srd`` index.
+    """
+    if valuta == BASE_CURRENCY:
+        return amount
+    rate = (
+        sa.select(ExchangeRate.srd_per_unit)
+        .where(ExchangeRate.valuta == valuta)
+        .scalar_subquery()
+    )
+    return amount * rate
+
+
+def _price_changed(target):
+    state = sa.inspect(target)
+    return any(
+        state.attrs[name].history.has_changes()
+        for name in ("prijs", "valuta", "type_object")
+    )
+
+
+@event.listens_for(Property, "before_insert")
+@event.listens_for(Property, "before_update")
+def _update_prices(mapper, connection, target):
+    if target.id is None or _price_changed(target) or area_fields_changed(target):
+        target.prijs_srd = price_in_srd(target.prijs, target.valuta)
+        area = main_area_m2(target)
+        target.prijs_per_m2 = (
+            price_in_srd(target.prijs, target.valuta) / area if area else None
+        )
+
+
+@event.listens_for(ExchangeRate.__table__, "after_create")
+def _seed_rates(table, connection, **kw):
+    # db.create_all() starts with usable rates; migrations seed their own
+    now = datetime.utcnow()
+    connection.execute(
+        table.insert(),
+        [
+            {"valuta": valuta, "srd_per_unit": rate, "updated_at": now}
+            for valuta, rate in INITIAL_RATES.items()
+        ],
+    )
+
+
+def set_rate(connection, valuta, srd_per_unit):
+    """Store the rate of ``valuta`` and reprice every listing in it.
+
+    The repriced listings get a new ``updated_at``: which listings match a
+    price filter may have changed, so their ETags must change too.
+    Returns the number of listings repriced.
+    """
+    now = datetime.utcnow()
+    rates = ExchangeRate.__table__
+    updated = connection.execute(
+        rates.update()
+        .where(rates.c.valuta == valuta)
+        .values(srd_per_unit=srd_per_unit, updated_at=now)
+    )
+    if not updated.rowcount:
+        connection.execute(
+            rates.insert().values(
+                valuta=valuta, srd_per_unit=srd_per_unit, updated_at=now
+            )
+        )
+
+    table = Property.__table__
+    result = connection.execute(
+        table.update()
+        .where(table.c.valuta == valuta)
+        .values(
+            prijs_srd=table.c.prijs * srd_per_unit,
+            prijs_per_m2=table.c.prijs * srd_per_unit / main_area_expression(table),
+            updated_at=now,
+        )
+    )
+    return result.rowcount
@@ -0,0 +1,65 @@
+"""
+Facet counts for the filter sidebar.
+
+For every facet the listings are counted per value with all current filters
+applied except the facet's own, so the sidebar can show how many results
+each alternative choice would give. All facets (plus the overall total) are
+fetched in one round trip as a UNION ALL of grouped queries.
+"""
+
+from sqlalchemy import func, literal, null
+
+from listings import listing_query
+from models import Property
+
+# facet -> filters that are ignored while counting it
+FACETS = {
+    "district": ("district", "wijk"),
+    "status": ("status",),
+    "type_object": ("type_object",),
+    "valuta": ("valuta",),
+    "grondrecht": ("grondrecht",),
+}
+
+TOTAL = "_total"
+
+
+def _without(spec, names):
+    return spec._replace(**{name: None for name in names})
+
+
+def facet_counts(spec):
+    """Count listings per facet value for a ``ListingFilter``.
+
+    Returns ``{"total": int, "facets": {facet: {value: count}}}``.
+    """
+    parts = [
+        listing_query(spec).with_entities(
+            literal(TOTAL).label("facet"),
+            null().label("value"),
+            func.count(Property.id).label("count"),
+        )
+    ]
+
+    for facet, ignored in FACETS.items():
+        column = getattr(Property, facet)
+        parts.append(
+            listing_query(_without(spec, ignored))
+            .filter(column.isnot(None))
+            .with_entities(
+                literal(facet).label("facet"),
+                column.label("value"),
+                func.count(Property.id).label("count"),
+            )
+            .group_by(column)
+        )
+
+    rows = parts[0].union_all(*parts[1:]).all()
+
+    result = {"total": 0, "facets": {facet: {} for facet in FACETS}}
+    for facet, value, count in rows:
+        if facet == TOTAL:
+            result["total"] = count
+        else:
+            result["facets"][facet][value] = count
+    return result
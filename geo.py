@@ -0,0 +1,294 @@
+"""
+Coordinates, map viewports and "within N km" search.
+
+Every listing has a ``latitude`` / ``longitude``: entered with the listing,
+or else the centroid of its wijk or district (locations.py). From them the
+mapper event below keeps ``geohash`` up to date.
+
+The geohash is the spatial index and works the same on SQLite and
+PostgreSQL: nearby points share a prefix, so a bounding box is covered by a
+handful of prefixes, each one a range scan on ``ix_property_geohash``; the
+exact box (and radius) is checked on the rows those ranges return. Its
+prefixes are also the grid ``cluster_markers`` groups a viewport on, so a
+map of any size costs one GROUP BY query.
+
+Filters (parsed with ``parse_bbox`` / ``parse_radius``, see listings.py):
+
+- ``bbox=south,west,north,east``: the map viewport
+- ``lat=..&lon=..&straal_km=..``: within a radius of a point
+"""
+
+import math
+
+import sqlalchemy as sa
+from sqlalchemy import event, func
+
+from locations import default_coordinates
+from models import Property
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # about 5 x 5 m
+
+# Most prefix ranges used to cover a bounding box
+MAX_COVER_CELLS = 24
+# Clusters are made on a grid of about this many cells per viewport
+CLUSTER_CELLS = 64
+
+KM_PER_DEGREE = 111.32
+
+
+# --------------------------------------------------
+# GEOHASH
+# --------------------------------------------------
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            bit = longitude >= mid
+            lon_range[0 if bit else 1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            bit = latitude >= mid
+            lat_range[0 if bit else 1] = mid
+        value = value * 2 + bit
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def _cell_count(south, west, north, east, precision):
+    height, width = cell_size(precision)
+    rows = math.floor(north / height) - math.floor(south / height) + 1
+    columns = math.floor(east / width) - math.floor(west / width) + 1
+    return rows * columns
+
+
+def cover(south, west, north, east, max_cells=MAX_COVER_CELLS):
+    """Geohash prefixes that together cover a bounding box (None: the world)."""
+    precision = 0
+    while precision < GEOHASH_PRECISION and (
+        _cell_count(south, west, north, east, precision + 1) <= max_cells
+    ):
+        precision += 1
+    if precision == 0:
+        return None
+
+    # One point per cell row and column, plus the far edges
+    height, width = cell_size(precision)
+    lats = [south + i * height for i in range(int((north - south) / height) + 1)]
+    lons = [west + i * width for i in range(int((east - west) / width) + 1)]
+    return sorted(
+        {
+            encode_geohash(lat, lon, precision)
+            for lat in lats + [north]
+            for lon in lons + [east]
+        }
+    )
+
+
+def _next_prefix(prefix):
+    """Smallest string after every geohash starting with ``prefix``."""
+    prefix = prefix.rstrip(GEOHASH_ALPHABET[-1])
+    if not prefix:
+        return None
+    return prefix[:-1] + GEOHASH_ALPHABET[GEOHASH_ALPHABET.index(prefix[-1]) + 1]
+
+
+def _prefix_range(column, prefix):
+    upper = _next_prefix(prefix)
+    if upper is None:
+        return column >= prefix
+    return sa.and_(column >= prefix, column < upper)
+
+
+# --------------------------------------------------
+# FILTERS
+# --------------------------------------------------
+
+
+def parse_bbox(value):
+    """``south,west,north,east`` -> tuple of floats, or None if invalid."""
+    try:
+        south, west, north, east = (float(part) for part in value.split(","))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        return None
+    return south, west, north, east
+
+
+def within_bbox(query, south, west, north, east):
+    query = query.filter(
+        Property.latitude.between(south, north),
+        Property.longitude.between(west, east),
+    )
+    prefixes = cover(south, west, north, east)
+    if prefixes:
+        query = query.filter(
+            sa.or_(*(_prefix_range(Property.geohash, p) for p in prefixes))
+        )
+    return query
+
+
+def within_radius(query, latitude, longitude, km):
+    """Listings within ``km`` of a point.
+
+    Distances use the equirectangular approximation, which is well within
+    a percent at Suriname's latitudes and needs no trigonometry in SQL.
+    """
+    degrees = km / KM_PER_DEGREE
+    scale = math.cos(math.radians(latitude))
+    lon_degrees = degrees / max(scale, 0.01)
+    query = within_bbox(
+        query,
+        max(latitude - degrees, -90),
+        max(longitude - lon_degrees, -180),
+        min(latitude + degrees, 90),
+        min(longitude + lon_degrees, 180),
+    )
+    d_lat = Property.latitude - latitude
+    d_lon = (Property.longitude - longitude) * scale
+    return query.filter(d_lat * d_lat + d_lon * d_lon <= degrees * degrees)
+
+
+def parse_radius(args):
+    """``lat``, ``lon`` and ``straal_km`` args -> tuple, or None if invalid."""
+    try:
+        latitude = float(args.get("lat", ""))
+        longitude = float(args.get("lon", ""))
+        km = float(args.get("straal_km", ""))
+    except ValueError:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and km > 0):
+        return None
+    return latitude, longitude, km
+
+
+# --------------------------------------------------
+# MAP CLUSTERS
+# --------------------------------------------------
+
+
+def cluster_precision(south, west, north, east):
+    precision = 1
+    while precision < GEOHASH_PRECISION and (
+        _cell_count(south, west, north, east, precision + 1) <= CLUSTER_CELLS
+    ):
+        precision += 1
+    return precision
+
+
+def cluster_markers(query, south, west, north, east):
+    """Markers for a viewport: listings grouped per geohash cell.
+
+    ``query`` should already be limited to the viewport. Each marker is the
+    mean position of its listings; a marker of a single listing has its id.
+    """
+    precision = cluster_precision(south, west, north, east)
+    cell = func.substr(Property.geohash, 1, precision).label("cell")
+    rows = (
+        query.order_by(None)
+        .with_entities(
+            cell,
+            func.count(Property.id),
+            func.avg(Property.latitude),
+            func.avg(Property.longitude),
+            func.min(Property.id),
+        )
+        .group_by(cell)
+        .all()
+    )
+
+    markers = []
+    for geohash, count, latitude, longitude, first_id in rows:
+        marker = {
+            "geohash": geohash,
+            "count": count,
+            "lat": round(latitude, 6),
+            "lon": round(longitude, 6),
+        }
+        if count == 1:
+            marker["id"] = first_id
+        markers.append(marker)
+    return precision, markers
+
+
+# --------------------------------------------------
+# COORDINATES
+# --------------------------------------------------
+
+
+def valid_coordinates(latitude, longitude):
+    return (
+        latitude is not None
+        and longitude is not None
+        and -90 <= latitude <= 90
+        and -180 <= longitude <= 180
+    )
+
+
+def listing_coordinates(fields):
+    """(latitude, longitude, geohash) for new listing fields (bulk import)."""
+    latitude, longitude = fields.get("latitude"), fields.get("longitude")
+    if not valid_coordinates(latitude, longitude):
+        latitude, longitude = default_coordinates(fields["district"], fields["wijk"])
+    if latitude is None:
+        return None, None, None
+    return latitude, longitude, encode_geohash(latitude, longitude)
+
+
+def _changed(state, *names):
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _previous(state, name):
+    history = state.attrs[name].history
+    values = history.deleted or history.unchanged
+    return values[0] if values else None
+
+
+@event.listens_for(Property, "before_insert")
+@event.listens_for(Property, "before_update")
+def _update_coordinates(mapper, connection, target):
+    state = sa.inspect(target)
+    if target.id is not None and not _changed(
+        state, "district", "wijk", "latitude", "longitude"
+    ):
+        return
+
+    # A new district or wijk moves a listing whose coordinates were the
+    # centroid of its old location; coordinates the owner entered stay
+    moved = (
+        target.id is not None
+        and not _changed(state, "latitude", "longitude")
+        and (target.latitude, target.longitude)
+        == tuple(
+            default_coordinates(_previous(state, "district"), _previous(state, "wijk"))
+        )
+    )
+    if moved or not valid_coordinates(target.latitude, target.longitude):
+        target.latitude, target.longitude = default_coordinates(
+            target.district, target.wijk
+        )
+    target.geohash = (
+        encode_geohash(target.latitude, target.longitude)
+        if target.latitude is not None
+        else None
+    )
@@ -0,0 +1,41 @@
+"""
+gunicorn settings, read automatically by ``gunicorn app:app``.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Threaded workers: a request waiting on the database or a password hash
+# leaves the worker's other threads serving. Each worker has its own
+# connection pool, see DB_POOL_SIZE in config.py
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app once in the master and fork the workers from it; engines
+# are disposed in each new worker (see _dispose_engines in app.py)
+preload_app = True
+
+# Replace workers now and then, spread out so they don't restart together
+max_requests = 2000
+max_requests_jitter = 200
+
+# Worker processes share their Prometheus metrics through this directory
+# (see metrics.py). It is emptied here, before the preloaded app writes its
+# first metrics in the master.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "prometheus-multiproc"),
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
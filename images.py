@@ -0,0 +1,192 @@
+"""
+Photo uploads and their resized variants.
+
+Every upload is stored as-is plus a set of downscaled WebP variants (and a
+JPEG fallback at card size), recorded on ``PropertyImage.variants`` as::
+
+    {"card": {"width": 480, "webp": "uploads/<name>_card.webp",
+              "jpeg": "uploads/<name>_card.jpg"},
+     "gallery": {"width": 960, "webp": "uploads/<name>_gallery.webp"},
+     "full": {"width": 1920, "webp": "uploads/<name>_full.webp"}}
+
+Paths are relative to the static folder, like ``image_path``. Sizes larger
+than the original are skipped, so small photos get fewer variants.
+
+Originals are content-addressed: ``uploads/<h[:2]>/<sha256>.<ext>``. The
+same photo uploaded twice maps to the same file (and the same variants), so
+it is written only once; ``PropertyImage.content_hash`` counts the
+references and files are only unlinked when the last one is gone.
+
+Each photo has its own ``photo_lock``. An upload holds it from finding or
+writing the file until its row is committed, and releasing the files counts
+the references and unlinks under it: otherwise the last reference could be
+deleted while an upload of the same photo, which found the file already on
+disk, has not committed its row yet.
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from PIL import Image, ImageOps
+from werkzeug.utils import secure_filename
+
+VARIANT_WIDTHS = {"card": 480, "gallery": 960, "full": 1920}
+JPEG_FALLBACK_SIZES = ("card",)
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
+
+UPLOAD_SUBDIR = "uploads"
+
+HASH_CHUNK_SIZE = 64 * 1024
+LOCK_DIR = ".locks"
+EXTENSION_ALIASES = {"jpeg": "jpg"}
+
+
+def allowed_file(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def _static_path(static_folder, relative_path):
+    return os.path.join(static_folder, *relative_path.split("/"))
+
+
+def generate_variants(static_folder, image_path):
+    """Write the resized variants of a stored photo and describe them."""
+    stem = image_path.rsplit(".", 1)[0]
+    variants = {}
+
+    with Image.open(_static_path(static_folder, image_path)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "L"):
+            original = original.convert("RGB")
+
+        previous_width = 0
+        for size, width in VARIANT_WIDTHS.items():
+            if previous_width >= original.width:
+                break
+
+            resized = original.copy()
+            resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+            previous_width = resized.width
+
+            variant = {"width": resized.width, "webp": f"{stem}_{size}.webp"}
+            resized.save(
+                _static_path(static_folder, variant["webp"]),
+                "WEBP",
+                quality=WEBP_QUALITY,
+                method=4,
+            )
+
+            if size in JPEG_FALLBACK_SIZES:
+                variant["jpeg"] = f"{stem}_{size}.jpg"
+                resized.save(
+                    _static_path(static_folder, variant["jpeg"]),
+                    "JPEG",
+                    quality=JPEG_QUALITY,
+                    optimize=True,
+                    progressive=True,
+                )
+
+            variants[size] = variant
+
+    return variants
+
+
+def content_path(content_hash, ext):
+    return f"{UPLOAD_SUBDIR}/{content_hash[:2]}/{content_hash}.{ext}"
+
+
+@contextmanager
+def photo_lock(static_folder, content_hash):
+    """Exclusive lock on one stored photo, across threads and worker processes."""
+    directory = os.path.join(static_folder, UPLOAD_SUBDIR, LOCK_DIR, content_hash[:2])
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, content_hash), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def photo_locks(static_folder, content_hashes):
+    """``photo_lock`` on several photos, taken in hash order so that two
+    uploads sharing photos cannot deadlock."""
+    with ExitStack() as stack:
+        for content_hash in sorted(set(content_hashes)):
+            stack.enter_context(photo_lock(static_folder, content_hash))
+        yield
+
+
+def hash_photo(photo):
+    """``(image_path, content_hash)`` an uploaded photo is stored under.
+
+    Reads the whole upload, leaving the stream at its end.
+    """
+    ext = secure_filename(photo.filename).rsplit(".", 1)[1].lower()
+    ext = EXTENSION_ALIASES.get(ext, ext)
+
+    # Uploads are spooled by Werkzeug, so the stream can be read twice
+    stream = photo.stream
+    stream.seek(0)
+    hasher = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+        hasher.update(chunk)
+    content_hash = hasher.hexdigest()
+    return content_path(content_hash, ext), content_hash
+
+
+def store_photo(photo, static_folder, image_path):
+    """Write a photo to its ``image_path`` unless it is already on disk."""
+    target = _static_path(static_folder, image_path)
+    if os.path.exists(target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    photo.stream.seek(0)
+    # Write under a temporary name so readers never see a partial file
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        shutil.copyfileobj(photo.stream, f, HASH_CHUNK_SIZE)
+    os.replace(tmp_path, target)
+
+
+def save_photo(photo, static_folder):
+    """Store an uploaded photo under its SHA-256 hash.
+
+    Returns ``(image_path, content_hash)``. If the same photo is already on
+    disk nothing is written. Variants are generated later by the
+    ``process_image`` job.
+    """
+    image_path, content_hash = hash_photo(photo)
+    store_photo(photo, static_folder, image_path)
+    return image_path, content_hash
+
+
+def image_files(image):
+    """All files on disk that belong to a PropertyImage."""
+    paths = [image.image_path]
+    for variant in (image.variants or {}).values():
+        paths.extend(variant[key] for key in ("webp", "jpeg") if key in variant)
+    return paths
+
+
+def files_exist(static_folder, paths):
+    return all(os.path.exists(_static_path(static_folder, path)) for path in paths)
+
+
+def delete_files(static_folder, paths):
+    for relative_path in paths:
+        path = _static_path(static_folder, relative_path)
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception as e:
+                print(f"Error deleting file {path}: {e}")
@@ -0,0 +1,212 @@
+"""
+Durable background jobs, stored in the ``job`` table.
+
+Routes call ``enqueue()`` inside their own transaction, so a job exists if
+and only if the change that needs it was committed. Workers (threads in the
+web process, or ``flask jobs-work``) claim pending jobs one at a time, run
+the registered handler and retry failures with exponential backoff.
+
+Handlers must be idempotent: a job can run more than once if a worker dies
+halfway, after which it is reclaimed once ``STALE_AFTER`` has passed.
+"""
+
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_, update
+from sqlalchemy.orm import Session
+
+from models import db, Job
+
+POLL_INTERVAL = 2.0  # seconds between polls when idle
+STALE_AFTER = timedelta(minutes=10)
+BACKOFF_BASE = 5  # seconds; doubles on every failed attempt
+
+HANDLERS = {}
+
+_wakeup = threading.Event()
+
+
+def utcnow():
+    return datetime.utcnow()
+
+
+# --------------------------------------------------
+# PRODUCERS
+# --------------------------------------------------
+
+
+def handler(kind):
+    """Register the function that runs jobs of the given kind."""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind, payload, key=None, max_attempts=5):
+    """Add a job to the current session; it is queued on commit.
+
+    A ``key`` makes the job idempotent: while a job with the same key is
+    still waiting, no second one is added.
+    """
+    if key is not None:
+        existing = Job.query.filter_by(dedupe_key=key).first()
+        if existing:
+            return existing
+
+    now = utcnow()
+    job = Job(
+        kind=kind,
+        payload=payload,
+        dedupe_key=key,
+        status="pending",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=now,
+        created_at=now,
+    )
+    db.session.add(job)
+    db.session.info["jobs_enqueued"] = True
+    return job
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session):
+    if session.info.pop("jobs_enqueued", False):
+        _wakeup.set()
+
+
+# --------------------------------------------------
+# CONSUMERS
+# --------------------------------------------------
+
+
+def claim_next():
+    """Atomically mark the next runnable job as running and return it."""
+    now = utcnow()
+    candidates = (
+        Job.query.filter(
+            or_(
+                (Job.status == "pending") & (Job.run_after <= now),
+                (Job.status == "running") & (Job.locked_at < now - STALE_AFTER),
+            )
+        )
+        .order_by(Job.run_after, Job.id)
+        .limit(5)
+        .all()
+    )
+
+    for job in candidates:
+        # Compare-and-set: only one worker can win the update
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == job.status)
+            .where(or_(Job.locked_at.is_(None), Job.locked_at == job.locked_at))
+            .values(status="running", locked_at=now, attempts=Job.attempts + 1)
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            db.session.refresh(job)
+            return job
+    return None
+
+
+def run_job(job):
+    func = HANDLERS.get(job.kind)
+    try:
+        if func is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}")
+        func(**job.payload)
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        job.last_error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.dedupe_key = None
+        else:
+            job.status = "pending"
+            job.run_after = utcnow() + timedelta(
+                seconds=BACKOFF_BASE * 2 ** (job.attempts - 1)
+            )
+        job.locked_at = None
+        db.session.commit()
+        print(f"Job {job.id} ({job.kind}) failed, attempt {job.attempts}")
+        return False
+
+    job.status = "done"
+    job.dedupe_key = None
+    job.locked_at = None
+    db.session.commit()
+    return True
+
+
+def work(app, stop_event=None, burst=False):
+    """Run jobs until ``stop_event`` is set (or the queue is empty if burst)."""
+    while stop_event is None or not stop_event.is_set():
+        with app.app_context():
+            try:
+                job = claim_next()
+                if job is not None:
+                    run_job(job)
+                    continue
+            except Exception as e:
+                # e.g. the database is briefly unavailable; keep the worker alive
+                db.session.rollback()
+                print(f"Job worker error: {e}")
+        if burst:
+            return
+        _wakeup.wait(POLL_INTERVAL)
+        _wakeup.clear()
+
+
+# --------------------------------------------------
+# IN-PROCESS WORKER
+# --------------------------------------------------
+
+
+class WorkerPool:
+    """Daemon worker threads inside the web process.
+
+    Started lazily and per process id, so it is safe with gunicorn forking
+    workers after the app module was imported.
+    """
+
+    def __init__(self, app=None, threads=2):
+        self.app = app
+        self.threads = threads
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.threads = app.config.setdefault("JOB_WORKER_THREADS", self.threads)
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        if self._pid == os.getpid() or self.threads <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            for i in range(self.threads):
+                threading.Thread(
+                    target=work,
+                    args=(self.app, self._stop),
+                    name=f"job-worker-{i}",
+                    daemon=True,
+                ).start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+        _wakeup.set()
@@ -0,0 +1,73 @@
+"""
+Validation of new listings, shared by ``add_property`` and the bulk import.
+
+``parse_listing`` takes the submitted fields (a form, a CSV row or a JSON
+object) and returns the keyword arguments for ``Property``, or raises
+``ListingError`` with a message for the user.
+"""
+
+import math
+
+REQUIRED_FIELDS = ("titel", "type_object", "status", "prijs", "district")
+DEFAULT_VALUTA = "SRD"
+
+
+class ListingError(ValueError):
+    pass
+
+
+def _text(data, name):
+    value = data.get(name)
+    return "" if value is None else str(value).strip()
+
+
+def _optional_float(data, name):
+    value = _text(data, name)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _coordinates(data):
+    latitude = _optional_float(data, "latitude")
+    longitude = _optional_float(data, "longitude")
+    if latitude is None or longitude is None:
+        return None, None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None, None
+    return latitude, longitude
+
+
+def parse_listing(data):
+    required = {name: _text(data, name) for name in REQUIRED_FIELDS}
+    if not all(required.values()):
+        raise ListingError("Vul alle verplichte velden in.")
+
+    try:
+        prijs = float(required["prijs"])
+        if not math.isfinite(prijs) or prijs < 0:
+            raise ValueError
+    except ValueError:
+        raise ListingError("Ongeldige prijs.") from None
+
+    # Without (valid) coordinates the wijk or district centroid is used
+    latitude, longitude = _coordinates(data)
+
+    return {
+        "titel": required["titel"],
+        "type_object": required["type_object"].lower(),
+        "status": required["status"].lower(),
+        "prijs": prijs,
+        "valuta": (_text(data, "valuta") or DEFAULT_VALUTA).upper(),
+        "grondrecht": _text(data, "grondrecht") or None,
+        "perceel_oppervlakte": _optional_float(data, "perceel_oppervlakte"),
+        "perceel_eenheid": _text(data, "perceel_eenheid") or None,
+        "woon_oppervlakte": _optional_float(data, "woon_oppervlakte"),
+        "woon_eenheid": _text(data, "woon_eenheid") or None,
+        "district": required["district"].lower(),
+        "wijk": _text(data, "wijk").lower() or None,
+        "latitude": latitude,
+        "longitude": longitude,
+        "beschrijving": _text(data, "beschrijving"),
+    }
@@ -0,0 +1,129 @@
+"""
+The listing query shared by the grids, the JSON API, the map and the facets.
+
+Query args are first turned into a ``ListingFilter`` by ``listing_filter``:
+only the filters that are set, normalized (case, numbers parsed, invalid
+values dropped). URLs that ask for the same listings give equal filters,
+and a filter is hashable, so it can key caches such as the match counts.
+
+``listing_query`` builds the filtered ``Property`` query once per filter
+and keeps it in an LRU cache; a request only attaches it to its session.
+All values in it are bound parameters, so SQLAlchemy's compiled statement
+cache also reuses the SQL of every filter with the same shape.
+"""
+
+import functools
+import math
+from typing import NamedTuple, Optional
+
+from currency import BASE_CURRENCY, price_in_srd
+from geo import parse_bbox, parse_radius, within_bbox, within_radius
+from models import Property, db
+from search import apply_search
+
+# Filter -> (column, convert the bound from the filter's currency to SRD)
+RANGE_FILTERS = {
+    "prijs": (Property.prijs_srd, True),
+    "prijs_m2": (Property.prijs_per_m2, True),
+    # Areas in m²
+    "perceel_m2": (Property.perceel_m2, False),
+    "woon_m2": (Property.woon_m2, False),
+}
+
+QUERY_CACHE_SIZE = 512
+
+
+class ListingFilter(NamedTuple):
+    district: Optional[str] = None
+    wijk: Optional[str] = None
+    status: Optional[str] = None
+    type_object: Optional[str] = None
+    valuta: Optional[str] = None
+    grondrecht: Optional[str] = None
+    # ((name, min, max), ...) for the RANGE_FILTERS that are set
+    ranges: tuple = ()
+    # (south, west, north, east)
+    bbox: Optional[tuple] = None
+    # (latitude, longitude, km)
+    radius: Optional[tuple] = None
+    q: Optional[str] = None
+
+
+def _text(args, name):
+    value = (args.get(name) or "").strip()
+    return value or None
+
+
+def _bound(args, name):
+    try:
+        value = float(args.get(name) or "")
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def listing_filter(args, type_object=None):
+    """The ``ListingFilter`` for query args; ``type_object`` overrides theirs."""
+    lower = {
+        name: (_text(args, name) or "").lower() or None
+        for name in ("district", "wijk", "status", "type_object", "grondrecht")
+    }
+    if type_object:
+        lower["type_object"] = type_object
+
+    ranges = []
+    for name in RANGE_FILTERS:
+        low, high = _bound(args, f"min_{name}"), _bound(args, f"max_{name}")
+        if low is not None or high is not None:
+            ranges.append((name, low, high))
+
+    valuta = _text(args, "valuta")
+    return ListingFilter(
+        valuta=valuta.upper() if valuta else None,
+        ranges=tuple(ranges),
+        bbox=parse_bbox(args.get("bbox")),
+        radius=parse_radius(args),
+        q=_text(args, "q"),
+        **lower,
+    )
+
+
+def _apply_filter(query, spec):
+    for name in ("district", "wijk", "status", "type_object", "valuta", "grondrecht"):
+        value = getattr(spec, name)
+        if value:
+            query = query.filter(getattr(Property, name) == value)
+
+    # Price bounds are in the chosen currency (SRD if none) and compared with
+    # the SRD price, so they work across currencies
+    bound_currency = spec.valuta or BASE_CURRENCY
+    for name, low, high in spec.ranges:
+        column, in_currency = RANGE_FILTERS[name]
+        for bound, compare in ((low, column.__ge__), (high, column.__le__)):
+            if bound is None:
+                continue
+            if in_currency:
+                bound = price_in_srd(bound, bound_currency)
+            query = query.filter(compare(bound))
+
+    # Map viewport and distance
+    if spec.bbox:
+        query = within_bbox(query, *spec.bbox)
+    if spec.radius:
+        query = within_radius(query, *spec.radius)
+    if spec.q:
+        query = apply_search(query, spec.q)
+    return query
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _cached_query(spec, dialect):
+    # The dialect is part of the key: full-text search differs per backend
+    return _apply_filter(Property.query, spec).with_session(None)
+
+
+def listing_query(spec):
+    """Property query with every filter of a ``ListingFilter`` applied."""
+    session = db.session()
+    dialect = session.get_bind().dialect.name
+    return _cached_query(spec, dialect).with_session(session)
@@ -86,3 +86,127 @@ DISTRICT_WIJKEN = {
         "Centrale Savanne",
     ],
 }
+
+# Opgeslagen (lowercase) wijknaam -> officiële weergave
+WIJK_LABELS = {
+    (district, wijk.lower()): wijk
+    for district, wijken in DISTRICT_WIJKEN.items()
+    for wijk in wijken
+}
+
+
+def wijk_label(district, wijk):
+    """Official spelling of a stored wijk, e.g. "weg naar zee" -> "Weg naar Zee"."""
+    if not wijk:
+        return None
+    return WIJK_LABELS.get((district, wijk), wijk.capitalize())
+
+
+# Opgeslagen (district, wijk) -> weergave, voor breadcrumb en locatielabel;
+# eenmalig berekend voor alle bekende combinaties
+LOCATION_LABELS = {
+    (district, wijk): (district.capitalize(), wijk_label(district, wijk))
+    for district, wijken in DISTRICT_WIJKEN.items()
+    for wijk in [None] + [w.lower() for w in wijken]
+}
+
+
+def location_labels(district, wijk):
+    """Display labels of a stored location, e.g. ("Paramaribo", "Weg naar Zee")."""
+    labels = LOCATION_LABELS.get((district, wijk))
+    if labels is None:
+        labels = (district.capitalize(), wijk_label(district, wijk))
+    return labels
+
+
+def split_location(value):
+    """Split the legacy "district - wijk" string into (district, wijk)."""
+    district, _, wijk = (value or "").partition(" - ")
+    return district.strip().lower(), wijk.strip().lower() or None
+
+
+# Benaderde middelpunten (latitude, longitude), standaardcoördinaten voor
+# advertenties zonder eigen locatie
+DISTRICT_CENTROIDS = {
+    "paramaribo": (5.852, -55.203),
+    "wanica": (5.735, -55.230),
+    "nickerie": (5.930, -56.950),
+    "commewijne": (5.830, -55.050),
+    "para": (5.480, -55.200),
+    "saramacca": (5.800, -55.480),
+    "brokopondo": (4.950, -55.000),
+    "marowijne": (5.500, -54.150),
+    "coronie": (5.870, -56.320),
+    "sipaliwini": (3.900, -55.900),
+}
+
+WIJK_CENTROIDS = {
+    ("paramaribo", "beekhuizen"): (5.835, -55.185),
+    ("paramaribo", "blauwgrond"): (5.870, -55.180),
+    ("paramaribo", "centrum"): (5.825, -55.160),
+    ("paramaribo", "flora"): (5.817, -55.198),
+    ("paramaribo", "latour"): (5.797, -55.190),
+    ("paramaribo", "livorno"): (5.790, -55.175),
+    ("paramaribo", "munder"): (5.840, -55.220),
+    ("paramaribo", "pontbuiten"): (5.805, -55.215),
+    ("paramaribo", "rainville"): (5.865, -55.200),
+    ("paramaribo", "tammenga"): (5.845, -55.240),
+    ("paramaribo", "weg naar zee"): (5.870, -55.260),
+    ("paramaribo", "welgelegen"): (5.830, -55.205),
+    ("wanica", "de nieuwe grond"): (5.775, -55.205),
+    ("wanica", "houttuin"): (5.760, -55.240),
+    ("wanica", "koewarasan"): (5.780, -55.275),
+    ("wanica", "lelydorp"): (5.700, -55.233),
+    ("wanica", "saramacca polder"): (5.800, -55.270),
+    ("wanica", "tout lui faut"): (5.780, -55.160),
+    ("wanica", "domburg"): (5.720, -55.080),
+    ("nickerie", "nieuw nickerie"): (5.950, -56.985),
+    ("nickerie", "groot henar"): (5.860, -56.860),
+    ("nickerie", "wageningen"): (5.770, -56.680),
+    ("nickerie", "oostelijke polders"): (5.930, -56.920),
+    ("nickerie", "westelijke polders"): (5.920, -57.030),
+    ("nickerie", "corantijnpolder"): (5.880, -57.060),
+    ("commewijne", "meerzorg"): (5.812, -55.150),
+    ("commewijne", "tamanredjo"): (5.740, -54.990),
+    ("commewijne", "alkmaar"): (5.810, -55.020),
+    ("commewijne", "bakkie"): (5.870, -54.970),
+    ("commewijne", "mariënburg"): (5.860, -55.040),
+    ("commewijne", "kroonenburg"): (5.830, -55.080),
+    ("para", "onverwacht"): (5.590, -55.190),
+    ("para", "bigi poika"): (5.250, -55.490),
+    ("para", "carolina"): (5.400, -55.160),
+    ("para", "zanderij"): (5.457, -55.203),
+    ("para", "noord"): (5.550, -55.150),
+    ("para", "zuid"): (5.350, -55.250),
+    ("saramacca", "groningen"): (5.800, -55.470),
+    ("saramacca", "calcutta"): (5.850, -55.600),
+    ("saramacca", "tijgerkreek"): (5.780, -55.400),
+    ("saramacca", "wayamboweg"): (5.700, -55.700),
+    ("brokopondo", "brownsweg"): (5.020, -55.170),
+    ("brokopondo", "centrum"): (5.060, -54.980),
+    ("brokopondo", "klaaskreek"): (5.100, -54.950),
+    ("brokopondo", "marshallkreek"): (5.300, -55.000),
+    ("brokopondo", "sarakreek"): (4.600, -55.050),
+    ("brokopondo", "kwatta"): (5.100, -55.050),
+    ("marowijne", "albina"): (5.500, -54.050),
+    ("marowijne", "moengo"): (5.620, -54.400),
+    ("marowijne", "galibi"): (5.750, -54.000),
+    ("marowijne", "patamacca"): (5.200, -54.300),
+    ("marowijne", "oost"): (5.400, -54.100),
+    ("coronie", "totness"): (5.880, -56.320),
+    ("coronie", "johanna maria"): (5.850, -56.250),
+    ("coronie", "welgelegen"): (5.870, -56.400),
+    ("sipaliwini", "boven coppename"): (4.500, -56.200),
+    ("sipaliwini", "boven suriname"): (4.000, -55.500),
+    ("sipaliwini", "coeroeni"): (2.500, -56.400),
+    ("sipaliwini", "kabalebo"): (4.600, -57.000),
+    ("sipaliwini", "tapanahony"): (3.500, -54.800),
+    ("sipaliwini", "centrale savanne"): (3.800, -55.600),
+}
+
+
+def default_coordinates(district, wijk):
+    """Centroid of the wijk, else of the district; (None, None) if unknown."""
+    return WIJK_CENTROIDS.get((district, wijk)) or DISTRICT_CENTROIDS.get(
+        district, (None, None)
+    )
@@ -0,0 +1,182 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+- ``http_requests_total`` / ``http_request_duration_seconds``: per endpoint
+- ``template_render_seconds``: per template
+- ``db_pool_connections``: open and checked-out database connections
+- ``photo_upload_bytes``: size of every uploaded photo
+- ``image_processing_seconds``: variant generation in the ``process_image`` job
+
+Under gunicorn every worker process keeps its own values. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (gunicorn.conf.py does this) they are
+written to memory-mapped files in that directory and ``/metrics`` adds them
+up over all workers, whichever one answers the scrape. Without it (``flask
+run``, CLI commands) the metrics of the current process are served.
+
+If ``METRICS_TOKEN`` is configured, scrapes must send it as a bearer token.
+With ``METRICS_TOKEN_REQUIRED`` (the production profile) ``/metrics`` is
+refused while no token is configured.
+"""
+
+import hmac
+import os
+import time
+
+from flask import (
+    Response,
+    abort,
+    before_render_template,
+    current_app,
+    g,
+    request,
+    template_rendered,
+)
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled",
+    ["method", "endpoint", "status"],
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request",
+    ["method", "endpoint"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+TEMPLATE_SECONDS = Histogram(
+    "template_render_seconds",
+    "Time spent rendering a template",
+    ["template"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+# livesum: connections of workers that have exited are dropped
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database connections held by the pool",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+UPLOAD_BYTES = Histogram(
+    "photo_upload_bytes",
+    "Size of uploaded photos",
+    buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 16e6),
+)
+IMAGE_PROCESSING_SECONDS = Histogram(
+    "image_processing_seconds",
+    "Time spent generating the variants of a photo",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+class Metrics:
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._finish_render, app)
+
+        # Once per process, for every engine
+        if not event.contains(Pool, "checkout", _on_checkout):
+            event.listen(Pool, "connect", _on_connect)
+            event.listen(Pool, "close", _on_close)
+            event.listen(Pool, "close_detached", _on_close)
+            event.listen(Pool, "checkout", _on_checkout)
+            event.listen(Pool, "checkin", _on_checkin)
+
+        app.add_url_rule("/metrics", "metrics", self.serve)
+
+    # --------------------------------------------------
+    # REQUESTS AND TEMPLATES
+    # --------------------------------------------------
+
+    @staticmethod
+    def _start():
+        g.metrics_started = time.perf_counter()
+
+    @staticmethod
+    def _finish(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            _record_request(started, response.status_code)
+        return response
+
+    @staticmethod
+    def _teardown(exc):
+        # after_request is skipped when an exception escapes the error
+        # handlers (or is propagated), so the request is a 500
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            _record_request(started, 500)
+
+    @staticmethod
+    def _start_render(sender, template, context, **extra):
+        g.setdefault("metrics_renders", []).append(time.perf_counter())
+
+    @staticmethod
+    def _finish_render(sender, template, context, **extra):
+        renders = g.get("metrics_renders")
+        if renders:
+            TEMPLATE_SECONDS.labels(template.name or "string").observe(
+                time.perf_counter() - renders.pop()
+            )
+
+    # --------------------------------------------------
+    # EXPOSITION
+    # --------------------------------------------------
+
+    @staticmethod
+    def serve():
+        token = current_app.config.get("METRICS_TOKEN")
+        if not token and current_app.config.get("METRICS_TOKEN_REQUIRED"):
+            # Not configured yet; a 403 would be turned into a redirect home
+            abort(503)
+        if token and not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            abort(401)
+
+        if os.environ.get(MULTIPROC_DIR_ENV):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def _record_request(started, status):
+    endpoint = request.endpoint or "none"
+    REQUESTS.labels(request.method, endpoint, status).inc()
+    REQUEST_SECONDS.labels(request.method, endpoint).observe(
+        time.perf_counter() - started
+    )
+
+
+def _on_connect(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.labels("open").inc()
+
+
+def _on_close(dbapi_connection, connection_record=None):
+    DB_POOL_CONNECTIONS.labels("open").dec()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CONNECTIONS.labels("checked_out").inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.labels("checked_out").dec()
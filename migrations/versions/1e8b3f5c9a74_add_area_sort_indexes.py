@@ -0,0 +1,36 @@
+"""Add portable composite indexes for the area sorts
+
+Revision ID: 1e8b3f5c9a74
+Revises: 6c2e9a4f1d83
+Create Date: 2026-10-18 00:14:37.520863
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1e8b3f5c9a74'
+down_revision = '6c2e9a4f1d83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_perceel_m2')
+        batch_op.drop_index('ix_property_woon_m2')
+        batch_op.create_index('ix_property_perceel_m2_id', ['perceel_m2', 'id'], unique=False)
+        batch_op.create_index('ix_property_type_perceel_m2_id', ['type_object', 'perceel_m2', 'id'], unique=False)
+        batch_op.create_index('ix_property_woon_m2_id', ['woon_m2', 'id'], unique=False)
+        batch_op.create_index('ix_property_type_woon_m2_id', ['type_object', 'woon_m2', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_type_woon_m2_id')
+        batch_op.drop_index('ix_property_woon_m2_id')
+        batch_op.drop_index('ix_property_type_perceel_m2_id')
+        batch_op.drop_index('ix_property_perceel_m2_id')
+        batch_op.create_index('ix_property_woon_m2', ['woon_m2'], unique=False)
+        batch_op.create_index('ix_property_perceel_m2', ['perceel_m2'], unique=False)
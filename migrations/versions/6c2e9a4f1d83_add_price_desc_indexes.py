@@ -0,0 +1,32 @@
+"""Add descending price indexes with NULLs last
+
+Revision ID: 6c2e9a4f1d83
+Revises: f3d9a5b2c718
+Create Date: 2026-10-17 23:58:14.381946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c2e9a4f1d83'
+down_revision = 'f3d9a5b2c718'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.create_index('ix_property_prijs_srd_desc', 'property', [sa.text('prijs_srd DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+        op.create_index('ix_property_type_prijs_srd_desc', 'property', ['type_object', sa.text('prijs_srd DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_property_type_prijs_srd_desc', table_name='property')
+        op.drop_index('ix_property_prijs_srd_desc', table_name='property')
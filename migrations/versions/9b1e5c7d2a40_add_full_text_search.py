@@ -0,0 +1,52 @@
+"""Add full-text search index
+
+Revision ID: 9b1e5c7d2a40
+Revises: ad706c92a0c9
+Create Date: 2026-10-17 19:05:12.118240
+
+PostgreSQL: tsvector column with a GIN index.
+SQLite: FTS5 shadow table property_fts.
+Both are populated from the existing rows.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from search import CREATE_FTS_TABLE, reindex_properties
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1e5c7d2a40'
+down_revision = 'ad706c92a0c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.add_column('property', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.create_index('ix_property_search_vector', 'property', ['search_vector'], unique=False, postgresql_using='gin')
+    else:
+        with op.batch_alter_table('property', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('search_vector', sa.Text(), nullable=True))
+
+    if bind.dialect.name == 'sqlite':
+        op.execute(CREATE_FTS_TABLE)
+
+    reindex_properties(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS property_fts')
+
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_property_search_vector', table_name='property', postgresql_using='gin')
+
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
@@ -0,0 +1,90 @@
+"""Add property coordinates and geohash
+
+Revision ID: a8f3c2d1e947
+Revises: d17a4c6e8b52
+Create Date: 2026-10-17 23:02:14.518302
+
+Existing rows get the centroid of their wijk (or district) and its
+geohash, in id-ordered batches.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from geo import encode_geohash
+from locations import default_coordinates
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8f3c2d1e947'
+down_revision = 'd17a4c6e8b52'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+property_table = sa.table(
+    'property',
+    sa.column('id', sa.Integer),
+    sa.column('district', sa.String),
+    sa.column('wijk', sa.String),
+    sa.column('latitude', sa.Float),
+    sa.column('longitude', sa.Float),
+    sa.column('geohash', sa.String),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+        batch_op.create_index(batch_op.f('ix_property_geohash'), ['geohash'], unique=False)
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(property_table.c.id, property_table.c.district, property_table.c.wijk)
+            .where(property_table.c.id > last_id)
+            .order_by(property_table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            latitude, longitude = default_coordinates(row.district, row.wijk)
+            if latitude is None:
+                continue
+            updates.append({
+                'row_id': row.id,
+                'new_latitude': latitude,
+                'new_longitude': longitude,
+                'new_geohash': encode_geohash(latitude, longitude),
+            })
+
+        if updates:
+            bind.execute(
+                property_table.update()
+                .where(property_table.c.id == sa.bindparam('row_id'))
+                .values(
+                    latitude=sa.bindparam('new_latitude'),
+                    longitude=sa.bindparam('new_longitude'),
+                    geohash=sa.bindparam('new_geohash'),
+                ),
+                updates,
+            )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_property_geohash'))
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
+
+    # ### end Alembic commands ###
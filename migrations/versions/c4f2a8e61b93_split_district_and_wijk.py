@@ -0,0 +1,75 @@
+"""Split district and wijk
+
+Revision ID: c4f2a8e61b93
+Revises: 9b1e5c7d2a40
+Create Date: 2026-10-17 19:21:40.502317
+
+Existing rows store "district - wijk" in property.district; they are
+parsed into the two columns in id-ordered batches.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from locations import split_location
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f2a8e61b93'
+down_revision = '9b1e5c7d2a40'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+property_table = sa.table(
+    'property',
+    sa.column('id', sa.Integer),
+    sa.column('district', sa.String),
+    sa.column('wijk', sa.String),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('wijk', sa.String(length=50), nullable=True))
+        batch_op.create_index('ix_property_district_wijk', ['district', 'wijk'], unique=False)
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(property_table.c.id, property_table.c.district)
+            .where(property_table.c.id > last_id)
+            .where(property_table.c.district.like('% - %'))
+            .order_by(property_table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            district, wijk = split_location(row.district)
+            updates.append({'row_id': row.id, 'new_district': district, 'new_wijk': wijk})
+
+        bind.execute(
+            property_table.update()
+            .where(property_table.c.id == sa.bindparam('row_id'))
+            .values(district=sa.bindparam('new_district'), wijk=sa.bindparam('new_wijk')),
+            updates,
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    bind = op.get_bind()
+    bind.execute(
+        property_table.update()
+        .where(property_table.c.wijk.isnot(None))
+        .values(district=property_table.c.district + ' - ' + property_table.c.wijk)
+    )
+
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_district_wijk')
+        batch_op.drop_column('wijk')
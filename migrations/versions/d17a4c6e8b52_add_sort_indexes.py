@@ -0,0 +1,56 @@
+"""Add composite indexes for the grid sorts
+
+Revision ID: d17a4c6e8b52
+Revises: b5c91e3d7f04
+Create Date: 2026-10-17 22:31:06.270518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd17a4c6e8b52'
+down_revision = 'b5c91e3d7f04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_type_object')
+        batch_op.drop_index('ix_property_prijs_srd')
+        batch_op.drop_index('ix_property_prijs_per_m2')
+        batch_op.create_index('ix_property_type_id', ['type_object', 'id'], unique=False)
+        batch_op.create_index('ix_property_type_status_id', ['type_object', 'status', 'id'], unique=False)
+        batch_op.create_index('ix_property_prijs_srd_id', ['prijs_srd', 'id'], unique=False)
+        batch_op.create_index('ix_property_type_prijs_srd', ['type_object', 'prijs_srd', 'id'], unique=False)
+        batch_op.create_index('ix_property_type_status_prijs_srd', ['type_object', 'status', 'prijs_srd', 'id'], unique=False)
+        batch_op.create_index('ix_property_prijs_per_m2_id', ['prijs_per_m2', 'id'], unique=False)
+        batch_op.create_index('ix_property_type_prijs_per_m2', ['type_object', 'prijs_per_m2', 'id'], unique=False)
+
+    if bind.dialect.name == 'postgresql':
+        op.create_index('ix_property_type_perceel_m2', 'property', ['type_object', sa.text('perceel_m2 DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+        op.create_index('ix_property_type_woon_m2', 'property', ['type_object', sa.text('woon_m2 DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_property_type_woon_m2', table_name='property')
+        op.drop_index('ix_property_type_perceel_m2', table_name='property')
+
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_type_prijs_per_m2')
+        batch_op.drop_index('ix_property_prijs_per_m2_id')
+        batch_op.drop_index('ix_property_type_status_prijs_srd')
+        batch_op.drop_index('ix_property_type_prijs_srd')
+        batch_op.drop_index('ix_property_prijs_srd_id')
+        batch_op.drop_index('ix_property_type_status_id')
+        batch_op.drop_index('ix_property_type_id')
+        batch_op.create_index('ix_property_prijs_per_m2', ['prijs_per_m2'], unique=False)
+        batch_op.create_index('ix_property_prijs_srd', ['prijs_srd'], unique=False)
+        batch_op.create_index('ix_property_type_object', ['type_object'], unique=False)
@@ -0,0 +1,30 @@
+"""Add composite indexes for the dashboard
+
+Revision ID: f3d9a5b2c718
+Revises: a8f3c2d1e947
+Create Date: 2026-10-17 23:41:52.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3d9a5b2c718'
+down_revision = 'a8f3c2d1e947'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_user_id')
+        batch_op.create_index('ix_property_user_id_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('ix_property_user_status_id', ['user_id', 'status', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_user_status_id')
+        batch_op.drop_index('ix_property_user_id_id')
+        batch_op.create_index('ix_property_user_id', ['user_id'], unique=False)
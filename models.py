@@ -1,5 +1,12 @@
+from datetime import datetime
+from itertools import chain
+
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, update
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Session
+
+from locations import location_labels
 
 db = SQLAlchemy()
 
@@ -24,12 +31,6 @@ class User(db.Model):
         cascade="all, delete-orphan",
     )
 
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-
 
 # --------------------------------------------------
 # PROPERTY
@@ -42,12 +43,17 @@ class Property(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     titel = db.Column(db.String(200), nullable=False)
-    type_object = db.Column(db.String(50), nullable=False, index=True)
+    type_object = db.Column(db.String(50), nullable=False)
     status = db.Column(db.String(50), nullable=False, index=True)
 
     prijs = db.Column(db.Float, nullable=False, index=True)
     valuta = db.Column(db.String(3), nullable=False, default="SRD", index=True)
 
+    # prijs converted to SRD at the current rate, maintained by currency.py
+    prijs_srd = db.Column(db.Float, nullable=True)
+    # SRD per m² of the main area (see areas.py)
+    prijs_per_m2 = db.Column(db.Float, nullable=True)
+
     # NEW: Grondrecht (title/ownership type)
     grondrecht = db.Column(
         db.String(20), nullable=True, index=True
@@ -59,14 +65,95 @@ class Property(db.Model):
     woon_oppervlakte = db.Column(db.Float, nullable=True)  # Living area
     woon_eenheid = db.Column(db.String(10), nullable=True)  # m2 or hectare
 
+    # The same areas in m², maintained by areas.py
+    perceel_m2 = db.Column(db.Float, nullable=True)
+    woon_m2 = db.Column(db.Float, nullable=True)
+
     district = db.Column(db.String(50), nullable=False, index=True)
+    wijk = db.Column(db.String(50), nullable=True)
+
+    # Position on the map; the wijk or district centroid unless entered.
+    # geohash is derived from it and serves as the spatial index (geo.py)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)
+
     beschrijving = db.Column(db.Text)
 
+    # Last change to the listing or its photos (ETag / Last-Modified)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        index=True,
+    )
+
+    # Full-text search document, maintained by search.py (PostgreSQL only)
+    search_vector = db.deferred(
+        db.Column(db.Text().with_variant(TSVECTOR(), "postgresql"), nullable=True)
+    )
+
     user_id = db.Column(
         db.Integer,
         db.ForeignKey("user.id"),
         nullable=False,
-        index=True,
+    )
+
+    __table_args__ = (
+        db.Index("ix_property_district_wijk", "district", "wijk"),
+        # The dashboard: an account's listings newest first, and per status
+        db.Index("ix_property_user_id_id", "user_id", "id"),
+        db.Index("ix_property_user_status_id", "user_id", "status", "id"),
+        # Filter + sort shapes of the listing grids (LISTING_SORTS in app.py),
+        # all ending in id so keyset pagination can seek on them
+        db.Index("ix_property_type_id", "type_object", "id"),
+        db.Index("ix_property_type_status_id", "type_object", "status", "id"),
+        db.Index("ix_property_prijs_srd_id", "prijs_srd", "id"),
+        db.Index("ix_property_type_prijs_srd", "type_object", "prijs_srd", "id"),
+        db.Index(
+            "ix_property_type_status_prijs_srd",
+            "type_object",
+            "status",
+            "prijs_srd",
+            "id",
+        ),
+        db.Index("ix_property_prijs_per_m2_id", "prijs_per_m2", "id"),
+        db.Index("ix_property_type_prijs_per_m2", "type_object", "prijs_per_m2", "id"),
+        db.Index("ix_property_perceel_m2_id", "perceel_m2", "id"),
+        db.Index("ix_property_type_perceel_m2_id", "type_object", "perceel_m2", "id"),
+        db.Index("ix_property_woon_m2_id", "woon_m2", "id"),
+        db.Index("ix_property_type_woon_m2_id", "type_object", "woon_m2", "id"),
+        # Highest price or largest area first with NULLs last: a plain index
+        # read backwards would put the NULLs first on PostgreSQL
+        db.Index(
+            "ix_property_prijs_srd_desc",
+            prijs_srd.desc().nulls_last(),
+            id.desc(),
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_property_type_prijs_srd_desc",
+            "type_object",
+            prijs_srd.desc().nulls_last(),
+            id.desc(),
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_property_type_perceel_m2",
+            "type_object",
+            perceel_m2.desc().nulls_last(),
+            id.desc(),
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_property_type_woon_m2",
+            "type_object",
+            woon_m2.desc().nulls_last(),
+            id.desc(),
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_property_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
     )
 
     images = db.relationship(
@@ -81,6 +168,25 @@ class Property(db.Model):
         ),
     )
 
+    def touch(self):
+        """Mark the listing as changed, for writes that bypass the ORM."""
+        self.updated_at = datetime.utcnow()
+
+    @property
+    def district_label(self):
+        return location_labels(self.district, self.wijk)[0]
+
+    @property
+    def wijk_label(self):
+        return location_labels(self.district, self.wijk)[1]
+
+    @property
+    def locatie(self):
+        """Display label, e.g. "Paramaribo - Weg naar Zee"."""
+        if self.wijk:
+            return f"{self.district_label} - {self.wijk_label}"
+        return self.district_label
+
 
 # --------------------------------------------------
 # PROPERTY IMAGE
@@ -101,6 +207,73 @@ class PropertyImage(db.Model):
 
     image_path = db.Column(db.String(255), nullable=False)
 
+    # SHA-256 of the original; rows sharing it share the files on disk
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+
+    # Resized WebP/JPEG versions, see images.py
+    variants = db.Column(db.JSON(none_as_null=True), nullable=True)
+
     is_primary = db.Column(db.Boolean, default=False)
 
     sort_order = db.Column(db.Integer, default=0, index=True)
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_properties(session, flush_context, instances):
+    """Photo changes count as a change to their listing's ``updated_at``."""
+    property_ids = {
+        image.property_id
+        for image in chain(session.new, session.dirty, session.deleted)
+        if isinstance(image, PropertyImage)
+        and image.property_id is not None
+        and (image not in session.dirty or session.is_modified(image))
+    }
+    if property_ids:
+        session.connection().execute(
+            update(Property.__table__)
+            .where(Property.__table__.c.id.in_(property_ids))
+            .values(updated_at=datetime.utcnow())
+        )
+
+
+# --------------------------------------------------
+# EXCHANGE RATE (see currency.py)
+# --------------------------------------------------
+
+
+class ExchangeRate(db.Model):
+    __tablename__ = "exchange_rate"
+
+    valuta = db.Column(db.String(3), primary_key=True)
+    srd_per_unit = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
+# --------------------------------------------------
+# JOB (background queue, see jobs.py)
+# --------------------------------------------------
+
+
+class Job(db.Model):
+    __tablename__ = "job"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+
+    # Jobs with the same key are only queued once while one is pending
+    dedupe_key = db.Column(db.String(120), nullable=True, unique=True)
+
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    last_error = db.Column(db.Text, nullable=True)
+
+    run_after = db.Column(db.DateTime, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index("ix_job_status_run_after", "status", "run_after"),)
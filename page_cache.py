@@ -0,0 +1,199 @@
+"""
+Rendered-page cache for anonymous visitors.
+
+Pages are stored in memory per worker process (LRU, bounded by entry count
+and total bytes) under the endpoint plus its normalized query args. Every
+entry carries tags such as ``listings:huis`` or ``property:12``; a write
+bumps the version of the tags it affects and every entry stored under an
+older version is treated as a miss.
+
+Tag versions live as small files in the instance folder, so an invalidation
+in one gunicorn worker is seen by all the others (one ``stat`` per tag).
+
+Logged-in users and requests with pending flash messages always bypass the
+cache. The validators set by ``conditional.py`` are stored with the page, so
+a revisit whose copy is still current gets a 304 straight from the cache.
+
+Fragments (``fragment``) are parts of a page that look the same to every
+visitor, so logged-in users get them from the cache too. Their key holds a
+version of what they show (e.g. the listing's ``updated_at``), so an edit
+makes a new key and the old entry ages out of the LRU.
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response, request, session
+from markupsafe import Markup
+
+# Response headers kept with a cached page
+STORED_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+class PageCache:
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version_dir = None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get("PAGE_CACHE_MAX_ENTRIES", self.max_entries)
+        self.max_bytes = app.config.get("PAGE_CACHE_MAX_BYTES", self.max_bytes)
+        self.version_dir = os.path.join(app.instance_path, "page-cache")
+        os.makedirs(self.version_dir, exist_ok=True)
+
+    # --------------------------------------------------
+    # TAG VERSIONS
+    # --------------------------------------------------
+
+    def _version_path(self, tag):
+        return os.path.join(self.version_dir, tag.replace(":", "-"))
+
+    def _versions(self, tags):
+        versions = []
+        for tag in tags:
+            try:
+                versions.append(os.stat(self._version_path(tag)).st_mtime_ns)
+            except FileNotFoundError:
+                versions.append(0)
+        return tuple(versions)
+
+    def invalidate(self, tags):
+        """Expire every page carrying one of ``tags``, in all workers."""
+        now = time.time_ns()
+        for tag in tags:
+            path = self._version_path(tag)
+            with open(path, "a"):
+                pass
+            os.utime(path, ns=(now, now))
+
+        tags = set(tags)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if tags & set(e[0])]:
+                self._drop(key)
+
+    # --------------------------------------------------
+    # ENTRIES
+    # --------------------------------------------------
+
+    def _drop(self, key):
+        body = self._entries.pop(key)[3]
+        self._size -= len(body)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+
+        tags, versions, mimetype, body, headers = entry
+        if self._versions(tags) != versions:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+            return None
+        return mimetype, body, headers
+
+    def set(self, key, tags, versions, mimetype, body, headers=()):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (tuple(tags), versions, mimetype, body, headers)
+            self._size += len(body)
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._size > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    # --------------------------------------------------
+    # FRAGMENTS
+    # --------------------------------------------------
+
+    def fragment(self, key, render):
+        """HTML of ``render()``, cached under ``("fragment",) + key``."""
+        key = ("fragment",) + tuple(key)
+        hit = self.get(key)
+        if hit is not None:
+            return Markup(hit[1])
+        html = render()
+        self.set(key, (), (), "text/html", html)
+        return Markup(html)
+
+    # --------------------------------------------------
+    # VIEW DECORATOR
+    # --------------------------------------------------
+
+    @staticmethod
+    def bypass():
+        return (
+            request.method != "GET"
+            or session.get("user_id") is not None
+            or bool(session.get("_flashes"))
+        )
+
+    @staticmethod
+    def make_key():
+        args = sorted((k, v) for k, v in request.args.items(multi=True) if v)
+        return request.endpoint, tuple(request.view_args.items()), tuple(args)
+
+    def cached(self, tags):
+        """Cache a view's 200 responses; ``tags(**view_args)`` names its tags."""
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(**view_args):
+                if self.version_dir is None or self.bypass():
+                    return view(**view_args)
+
+                key = self.make_key()
+                hit = self.get(key)
+                if hit is not None:
+                    mimetype, body, headers = hit
+                    response = Response(body, mimetype=mimetype, headers=headers)
+                    response.headers["X-Cache"] = "HIT"
+                    response.vary.add("Cookie")
+                    return response.make_conditional(request)
+
+                # Versions are read before rendering: a write that lands
+                # while this page renders makes the stored copy stale
+                page_tags = tags(**view_args)
+                versions = self._versions(page_tags)
+
+                response = make_response(view(**view_args))
+                if (
+                    response.status_code == 200
+                    and not response.direct_passthrough
+                    and not session.get("_flashes")
+                ):
+                    self.set(
+                        key,
+                        page_tags,
+                        versions,
+                        response.mimetype,
+                        response.get_data(),
+                        tuple(
+                            (name, response.headers[name])
+                            for name in STORED_HEADERS
+                            if name in response.headers
+                        ),
+                    )
+                    response.headers["X-Cache"] = "MISS"
+                return response
+
+            return wrapper
+
+        return decorator
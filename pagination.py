@@ -0,0 +1,144 @@
+"""
+Keyset (seek) pagination for the listing grids.
+
+Instead of OFFSET, each page is fetched with a WHERE clause on the sort key
+of the last row the visitor saw, so page 50 costs the same as page 1. The
+position travels as an opaque ``after=`` / ``before=`` cursor token.
+
+The total number of matches is not needed to page through results; it is
+only shown as "N advertenties gevonden".
+"""
+
+import base64
+import json
+
+from sqlalchemy import and_, false, or_, tuple_
+
+CURSOR_ARGS = ("after", "before", "page")
+
+
+# --------------------------------------------------
+# CURSORS
+# --------------------------------------------------
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    """Return the sort key stored in a cursor, or None if it is invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _seek_condition(keys, values, forward):
+    """Rows strictly after (forward) or before the given sort key."""
+
+    def beyond(expr, descending, value):
+        return expr < value if descending == forward else expr > value
+
+    def beyond_nullable(expr, descending, value):
+        # NULLs sort last in either direction
+        if value is None:
+            return expr.isnot(None) if not forward else false()
+        if forward:
+            return or_(beyond(expr, descending, value), expr.is_(None))
+        return beyond(expr, descending, value)
+
+    def equal(expr, value):
+        return expr.is_(None) if value is None else expr == value
+
+    directions = {descending for _, descending, _ in keys}
+    if len(directions) == 1 and not any(nullable for _, _, nullable in keys):
+        # Uniform direction: a row-value comparison the index can seek on
+        exprs = tuple_(*(expr for expr, _, _ in keys))
+        return beyond(exprs, directions.pop(), tuple_(*values))
+
+    clauses = []
+    for i, (expr, descending, nullable) in enumerate(keys):
+        prefix = [equal(keys[j][0], values[j]) for j in range(i)]
+        if nullable:
+            clauses.append(and_(*prefix, beyond_nullable(expr, descending, values[i])))
+        else:
+            clauses.append(and_(*prefix, beyond(expr, descending, values[i])))
+    return or_(*clauses)
+
+
+def _order_by(expr, descending, nullable, forward):
+    order = expr.desc() if descending == forward else expr.asc()
+    if nullable:
+        order = order.nulls_last() if forward else order.nulls_first()
+    return order
+
+
+# --------------------------------------------------
+# PAGE
+# --------------------------------------------------
+
+
+class KeysetPage:
+    def __init__(self, items, per_page, next_cursor, prev_cursor, args, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        # Query args without any position, for building next/previous links
+        self.args = args
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def paginate_keyset(query, keys, args, per_page):
+    """Fetch one page of ``query`` ordered by ``keys``.
+
+    ``keys`` is a list of ``(expression, descending)`` pairs whose last entry
+    must be unique (normally ``Property.id``). A key that can be NULL is
+    given as ``(expression, descending, True)``; its NULLs sort last.
+    """
+    keys = [(key[0], key[1], key[2] if len(key) > 2 else False) for key in keys]
+    after = decode_cursor(args.get("after"), len(keys))
+    before = decode_cursor(args.get("before"), len(keys)) if not after else None
+    forward = before is None
+
+    query = query.add_columns(*(expr for expr, _, _ in keys))
+    if after or before:
+        query = query.filter(_seek_condition(keys, after or before, forward))
+
+    order = [
+        _order_by(expr, descending, nullable, forward)
+        for expr, descending, nullable in keys
+    ]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    items = [row[0] for row in rows]
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or not forward:
+            next_cursor = encode_cursor(rows[-1][1:])
+        if (has_more and not forward) or after:
+            prev_cursor = encode_cursor(rows[0][1:])
+
+    page_args = {k: v for k, v in args.items() if k not in CURSOR_ARGS}
+    return KeysetPage(items, per_page, next_cursor, prev_cursor, page_args)
@@ -0,0 +1,91 @@
+"""
+Password hashing off the request thread.
+
+scrypt is slow on purpose (tens of milliseconds of pure CPU), so a burst of
+logins would otherwise keep every worker busy hashing. Hashes are computed
+in a small process pool instead: at most ``PASSWORD_HASH_WORKERS`` run at
+once per web worker, and with more than ``PASSWORD_HASH_QUEUE`` waiting
+new requests get ``HasherBusy`` right away (the views answer 503) rather
+than piling up. The rest of the site keeps its CPU share.
+
+``PASSWORD_HASH_METHOD`` is the Werkzeug method for new hashes. A login
+whose stored hash was made with other parameters is rehashed with the
+current ones, see ``needs_rehash``.
+
+With ``PASSWORD_HASH_WORKERS = 0`` hashing runs inline (CLI commands).
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = "scrypt"
+        self.workers = 2
+        self.queue_limit = 4
+        self.timeout = 10.0
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+        self._prefix = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.setdefault("PASSWORD_HASH_METHOD", self.method)
+        self.workers = app.config.setdefault("PASSWORD_HASH_WORKERS", self.workers)
+        self.queue_limit = app.config.setdefault(
+            "PASSWORD_HASH_QUEUE", self.queue_limit
+        )
+        self.timeout = app.config.setdefault("PASSWORD_HASH_TIMEOUT", self.timeout)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+
+    def _executor(self):
+        # A pool inherited through fork has no live processes: start a new one
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HasherBusy() from None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if a hash was made with other parameters than new ones get."""
+        if self._prefix is None:
+            # e.g. "scrypt:32768:8:1"; the method name alone is not enough
+            self._prefix = self.hash("").split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self._prefix
@@ -0,0 +1,48 @@
+"""
+Token-bucket rate limiting for the login and register forms.
+
+Each key (a client IP, an e-mail address) has a bucket of ``capacity``
+tokens that refills at one token per ``per_seconds``; an attempt takes a
+token, and without one it is refused with the time until the next token.
+Short bursts pass, sustained guessing is slowed to the refill rate.
+
+Buckets live in memory per worker process (LRU-bounded, so a flood of
+distinct keys can't grow it without limit); with several gunicorn workers
+the effective limit is that many times higher.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    def __init__(self, capacity, per_seconds, max_keys=10_000):
+        self.capacity = capacity
+        self.per_seconds = per_seconds
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Take a token for ``key``: 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) / self.per_seconds)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) * self.per_seconds
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
@@ -0,0 +1,310 @@
+"""
+Full-text search for listings (the ``q`` filter).
+
+PostgreSQL: ``property.search_vector`` is a tsvector built with the Dutch
+text search configuration and backed by a GIN index; results are ranked
+with ``ts_rank_cd``.
+
+SQLite: ``property_fts`` is an FTS5 shadow table keyed on ``property.id``
+and kept in sync by the mapper events below; results are ranked with bm25.
+SQLite has no Dutch stemmer, so a light suffix stemmer runs in Python on
+both the indexed text and the query.
+
+Both backends index accent-folded text, so "marienburg" finds "Mariënburg".
+"""
+
+import re
+import unicodedata
+
+import sqlalchemy as sa
+from sqlalchemy import event, func, or_
+
+from models import Property
+
+TS_CONFIG = "dutch"
+REINDEX_BATCH_SIZE = 500
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+VOWELS = set("aeiouy")
+
+# The shadow table lives outside db.metadata so create_all() and Alembic
+# autogenerate never treat it as a regular table.
+fts_metadata = sa.MetaData()
+property_fts = sa.Table(
+    "property_fts",
+    fts_metadata,
+    sa.Column("rowid", sa.Integer, primary_key=True),
+    sa.Column("titel", sa.Text),
+    sa.Column("beschrijving", sa.Text),
+    sa.Column("rank", sa.Float),
+)
+
+CREATE_FTS_TABLE = sa.DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS property_fts "
+    "USING fts5(titel, beschrijving, tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+# --------------------------------------------------
+# TEXT NORMALISATION
+# --------------------------------------------------
+
+
+def fold_text(value):
+    """Lowercase and strip diacritics: "Mariënburg" -> "marienburg"."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def stem_word(word):
+    """Light Dutch stemmer: plurals, diminutives and doubled consonants.
+
+    Only used on SQLite; PostgreSQL uses its own Snowball "dutch" stemmer.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+
+    for suffix in ("etjes", "tjes", "jes", "etje", "tje", "je"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    else:
+        if word.endswith("heden"):
+            word = word[:-5] + "heid"
+        elif word.endswith(("en", "ene")) and len(word) > 4:
+            word = word[: -3 if word.endswith("ene") else -2]
+            # huizen -> huis, brieven -> brief
+            if word[-1] == "z":
+                word = word[:-1] + "s"
+            elif word[-1] == "v":
+                word = word[:-1] + "f"
+        elif word.endswith("s") and len(word) > 4 and word[-2] not in VOWELS:
+            word = word[:-1]
+        elif word.endswith("e") and len(word) > 4 and word[-2] not in VOWELS:
+            word = word[:-1]
+
+    # woningen -> woning, bakken -> bakk -> bak
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in VOWELS:
+        word = word[:-1]
+    return word
+
+
+def tokenize(value):
+    return WORD_RE.findall(fold_text(value))
+
+
+def stem_text(value):
+    return " ".join(stem_word(token) for token in tokenize(value))
+
+
+# --------------------------------------------------
+# INDEX MAINTENANCE
+# --------------------------------------------------
+
+
+def _weighted_vector(titel, beschrijving):
+    # Weights are "char" in PostgreSQL, so they must not be bound as VARCHAR
+    titel_vector = func.setweight(
+        func.to_tsvector(TS_CONFIG, titel), sa.literal_column("'A'")
+    )
+    beschrijving_vector = func.setweight(
+        func.to_tsvector(TS_CONFIG, beschrijving), sa.literal_column("'B'")
+    )
+    return titel_vector.op("||")(beschrijving_vector)
+
+
+def search_vector_expression(titel, beschrijving):
+    """tsvector for PostgreSQL: title weighted above description."""
+    return _weighted_vector(fold_text(titel), fold_text(beschrijving))
+
+
+def _write_fts_row(connection, property_id, titel, beschrijving):
+    connection.execute(property_fts.delete().where(property_fts.c.rowid == property_id))
+    connection.execute(
+        property_fts.insert().values(
+            rowid=property_id,
+            titel=stem_text(titel),
+            beschrijving=stem_text(beschrijving),
+        )
+    )
+
+
+def _search_fields_changed(target):
+    state = sa.inspect(target)
+    return any(
+        state.attrs[name].history.has_changes() for name in ("titel", "beschrijving")
+    )
+
+
+@event.listens_for(Property, "before_insert")
+@event.listens_for(Property, "before_update")
+def _update_search_vector(mapper, connection, target):
+    if connection.dialect.name != "postgresql":
+        return
+    if target.id is None or _search_fields_changed(target):
+        target.search_vector = search_vector_expression(
+            target.titel, target.beschrijving
+        )
+
+
+@event.listens_for(Property, "after_insert")
+def _index_inserted(mapper, connection, target):
+    if connection.dialect.name == "sqlite":
+        _write_fts_row(connection, target.id, target.titel, target.beschrijving)
+
+
+@event.listens_for(Property, "after_update")
+def _index_updated(mapper, connection, target):
+    if connection.dialect.name == "sqlite" and _search_fields_changed(target):
+        _write_fts_row(connection, target.id, target.titel, target.beschrijving)
+
+
+@event.listens_for(Property, "after_delete")
+def _index_deleted(mapper, connection, target):
+    if connection.dialect.name == "sqlite":
+        connection.execute(
+            property_fts.delete().where(property_fts.c.rowid == target.id)
+        )
+
+
+# db.create_all() also creates the shadow table on SQLite
+event.listen(
+    Property.__table__, "after_create", CREATE_FTS_TABLE.execute_if(dialect="sqlite")
+)
+
+
+def index_properties(connection, rows):
+    """Index listings written without the ORM: reindexing, bulk import.
+
+    ``rows`` are ``(id, titel, beschrijving)`` tuples; each backend gets one
+    executemany for the lot.
+    """
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        ids = [row[0] for row in rows]
+        connection.execute(property_fts.delete().where(property_fts.c.rowid.in_(ids)))
+        connection.execute(
+            property_fts.insert(),
+            [
+                {
+                    "rowid": id_,
+                    "titel": stem_text(titel),
+                    "beschrijving": stem_text(beschrijving),
+                }
+                for id_, titel, beschrijving in rows
+            ],
+        )
+    elif dialect == "postgresql":
+        table = Property.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam("row_id"))
+            .values(
+                search_vector=_weighted_vector(
+                    sa.bindparam("folded_titel"), sa.bindparam("folded_beschrijving")
+                )
+            ),
+            [
+                {
+                    "row_id": id_,
+                    "folded_titel": fold_text(titel),
+                    "folded_beschrijving": fold_text(beschrijving),
+                }
+                for id_, titel, beschrijving in rows
+            ],
+        )
+
+
+def reindex_properties(connection, batch_size=REINDEX_BATCH_SIZE):
+    """Rebuild the search index for every listing, in id-ordered batches."""
+    dialect = connection.dialect.name
+    table = Property.__table__
+
+    if dialect == "sqlite":
+        connection.execute(CREATE_FTS_TABLE)
+        connection.execute(property_fts.delete())
+    elif dialect != "postgresql":
+        return 0
+
+    last_id = 0
+    total = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.titel, table.c.beschrijving)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        index_properties(connection, rows)
+        last_id = rows[-1].id
+        total += len(rows)
+    return total
+
+
+# --------------------------------------------------
+# QUERYING
+# --------------------------------------------------
+
+
+def _dialect_name(query):
+    return query.session.get_bind().dialect.name
+
+
+def _pg_tsquery(terms):
+    # Tokens are \w+ only, so they are safe to join into tsquery syntax
+    return func.to_tsquery(TS_CONFIG, " & ".join(f"{t}:*" for t in terms))
+
+
+def _fts_match(terms):
+    return " ".join(f'"{stem_word(t)}"*' for t in terms)
+
+
+def apply_search(query, term):
+    """Restrict a Property query to listings matching the search term."""
+    terms = tokenize(term)
+    if not terms:
+        return query
+
+    dialect = _dialect_name(query)
+    if dialect == "postgresql":
+        return query.filter(Property.search_vector.op("@@")(_pg_tsquery(terms)))
+    if dialect == "sqlite":
+        return query.join(property_fts, property_fts.c.rowid == Property.id).filter(
+            sa.text("property_fts MATCH :fts_query").bindparams(
+                fts_query=_fts_match(terms)
+            )
+        )
+
+    zoekterm = f"%{term.strip().lower()}%"
+    return query.filter(
+        or_(
+            Property.titel.ilike(zoekterm),
+            Property.beschrijving.ilike(zoekterm),
+        )
+    )
+
+
+def relevance_key(query, term):
+    """Sort key ``(expression, descending)`` for best match first.
+
+    Returns None when the backend has no ranking. Must be used on a query
+    that already went through apply_search().
+    """
+    terms = tokenize(term)
+    if not terms:
+        return None
+
+    dialect = _dialect_name(query)
+    if dialect == "postgresql":
+        return func.ts_rank_cd(Property.search_vector, _pg_tsquery(terms)), True
+    if dialect == "sqlite":
+        # FTS5 rank is bm25(): lower is better
+        return property_fts.c.rank, False
+    return None
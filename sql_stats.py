@@ -0,0 +1,180 @@
+"""
+Per-request SQL instrumentation.
+
+Every statement run while handling a request is counted and timed. When
+the response goes out it gets a ``Server-Timing`` header (visible in the
+browser's network panel) and one JSON log line on the ``sql_stats`` logger:
+
+    {"endpoint": "main.home", "status": 200, "queries": 4, "db_ms": 3.1,
+     "duration_ms": 14.2, "duplicates": {...}}
+
+``duplicates`` lists statement shapes (the SQL with its parameters folded
+away) that ran more than once: the fingerprint of an N+1 such as a lazy
+``listing.images`` load inside a loop. From ``SQL_DUPLICATE_THRESHOLD``
+repeats it is logged as a warning.
+
+A view can declare a query budget with ``@query_budget(n)``
+(``SQL_QUERY_BUDGET`` is the default for views without one). Going over
+budget logs a warning; with ``SQL_QUERY_BUDGET_STRICT`` (meant for tests)
+it raises ``QueryBudgetExceeded`` instead, failing the request.
+
+Statements outside a request (background jobs, CLI commands) are ignored.
+"""
+
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("sql_stats")
+
+# "IN (?, ?, ?)" and "IN (%(id_1_1)s, %(id_1_2)s)" have one shape
+_PARAM_LIST_RE = re.compile(r"\(\s*(?:\?|%\(\w+\)s)(?:\s*,\s*(?:\?|%\(\w+\)s))+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def statement_shape(statement):
+    shape = _PARAM_LIST_RE.sub("(?)", statement)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may run."""
+
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+
+    return decorator
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+
+    def duplicates(self):
+        return {shape: n for shape, n in self.shapes.most_common() if n > 1}
+
+
+class SQLStats:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SQL_STATS", True)
+        app.config.setdefault("SQL_QUERY_BUDGET", None)
+        app.config.setdefault("SQL_QUERY_BUDGET_STRICT", False)
+        app.config.setdefault("SQL_DUPLICATE_THRESHOLD", 3)
+        if not app.config["SQL_STATS"]:
+            return
+
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(
+                logging.Formatter("%(levelname)s %(name)s %(message)s")
+            )
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+        # Once per process: every engine, whichever app created it
+        if not event.contains(Engine, "before_cursor_execute", _before_execute):
+            event.listen(Engine, "before_cursor_execute", _before_execute)
+            event.listen(Engine, "after_cursor_execute", _after_execute)
+            event.listen(Engine, "handle_error", _on_error)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    @staticmethod
+    def _start():
+        g.sql_stats = RequestStats()
+
+    @staticmethod
+    def _finish(response):
+        stats = g.pop("sql_stats", None)
+        if stats is None:
+            return response
+
+        duration_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_time * 1000
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={db_ms:.1f};desc="{stats.queries} queries", '
+            f"app;dur={duration_ms:.1f}",
+        )
+
+        config = current_app.config
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", config["SQL_QUERY_BUDGET"])
+        duplicates = stats.duplicates()
+        over_budget = budget is not None and stats.queries > budget
+        suspect_n_plus_1 = any(
+            n >= config["SQL_DUPLICATE_THRESHOLD"] for n in duplicates.values()
+        )
+
+        line = json.dumps(
+            {
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "queries": stats.queries,
+                "budget": budget,
+                "db_ms": round(db_ms, 1),
+                "duration_ms": round(duration_ms, 1),
+                "duplicates": duplicates,
+            },
+            ensure_ascii=False,
+        )
+        if over_budget or suspect_n_plus_1:
+            logger.warning(line)
+        else:
+            logger.info(line)
+
+        if over_budget and config["SQL_QUERY_BUDGET_STRICT"]:
+            raise QueryBudgetExceeded(
+                f"{request.endpoint} ran {stats.queries} queries (budget {budget})"
+            )
+        return response
+
+
+def _current_stats():
+    if not has_request_context():
+        return None
+    return g.get("sql_stats")
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault("sql_stats_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    started = conn.info.get("sql_stats_started")
+    if stats is None or not started:
+        return
+    stats.db_time += time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.shapes[statement_shape(statement)] += 1
+
+
+def _on_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("sql_stats_started"):
+        connection.info["sql_stats_started"].pop()
@@ -0,0 +1,59 @@
+/* =====================================================
+   FILTER AANTALLEN (FACETS)
+   Toont per optie hoeveel advertenties er zijn, gegeven
+   de overige filters. Eén request naar /api/facets.
+   ===================================================== */
+document.addEventListener("DOMContentLoaded", function () {
+  const form = document.getElementById("filterForm");
+  if (!form) return;
+
+  const selects = {
+    district: document.getElementById("districtSelect"),
+    status: document.getElementById("statusSelect"),
+    type_object: document.getElementById("typeSelect"),
+    valuta: document.getElementById("valutaSelect"),
+  };
+
+  const params = new URLSearchParams();
+  new FormData(form).forEach((value, key) => {
+    if (value) params.append(key, value);
+  });
+
+  // Huizen/percelen pagina's filteren vast op type
+  if (form.dataset.typeObject) {
+    params.set("type_object", form.dataset.typeObject);
+  }
+
+  fetch(`/api/facets?${params.toString()}`, {
+    headers: { Accept: "application/json" },
+  })
+    .then((res) => {
+      if (!res.ok) {
+        throw new Error(`HTTP error! status: ${res.status}`);
+      }
+      return res.json();
+    })
+    .then((data) => {
+      Object.entries(selects).forEach(([facet, select]) => {
+        if (!select) return;
+        const counts = data.facets[facet] || {};
+
+        select.querySelectorAll("option").forEach((option) => {
+          if (!option.value) return;
+
+          // Keep the original label so counts never stack up
+          if (!option.dataset.label) {
+            option.dataset.label = option.textContent.trim();
+          }
+
+          const key = facet === "valuta" ? option.value : option.value.toLowerCase();
+          const count = counts[key] || 0;
+          option.textContent = `${option.dataset.label} (${count})`;
+        });
+      });
+    })
+    .catch((error) => {
+      // Counts are optional; the filters keep working without them
+      console.warn("Could not load facet counts:", error);
+    });
+});
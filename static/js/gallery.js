@@ -9,8 +9,9 @@ function changePhoto(el) {
     return;
   }
 
-  // Update main photo source
-  mainPhoto.src = el.src;
+  // Update main photo source (thumbnails themselves are small variants)
+  mainPhoto.srcset = el.dataset.srcset || "";
+  mainPhoto.src = el.dataset.fullSrc || el.src;
 
   // Update alt text for accessibility
   const thumbnailAlt = el.getAttribute("alt") || "Property photo";
@@ -83,7 +84,7 @@ document.addEventListener("DOMContentLoaded", function () {
     mainPhoto.style.cursor = "zoom-in";
 
     mainPhoto.addEventListener("click", function () {
-      openLightbox(this.src);
+      openLightbox(this.currentSrc || this.src);
     });
   }
 });
@@ -1,3 +1,34 @@
+/* =====================================================
+   FOTO-OPERATIES (één batch-request per actie)
+   ===================================================== */
+async function sendImageOperations(operations) {
+  const grid = document.getElementById("photoGrid");
+  const propertyId = grid && grid.dataset.propertyId;
+  if (!propertyId) {
+    throw new Error("No property ID found on photo grid");
+  }
+
+  const res = await fetch(`/property/${propertyId}/images`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "application/json",
+      "X-Requested-With": "XMLHttpRequest",
+    },
+    body: JSON.stringify({ operations }),
+  });
+
+  if (!res.ok) {
+    throw new Error(`HTTP error! status: ${res.status}`);
+  }
+
+  const data = await res.json();
+  if (!data.success) {
+    throw new Error(data.error || "Unknown error");
+  }
+  return data;
+}
+
 /* =====================================================
    VERWIJDER FOTO (AJAX)
    ===================================================== */
@@ -30,24 +61,8 @@ document.addEventListener("click", function (e) {
   const originalContent = btn.innerHTML;
   btn.innerHTML = "⏳";
 
-  fetch(`/property/image/${imageId}/delete`, {
-    method: "POST",
-    headers: {
-      Accept: "application/json",
-      "X-Requested-With": "XMLHttpRequest",
-    },
-  })
-    .then((res) => {
-      if (!res.ok) {
-        throw new Error(`HTTP error! status: ${res.status}`);
-      }
-      return res.json();
-    })
+  sendImageOperations([{ op: "delete", id: Number(imageId) }])
     .then((data) => {
-      if (!data.success) {
-        throw new Error(data.error || "Unknown error");
-      }
-
       // Find the image card wrapper
       const card = btn.closest(".edit-image-card");
 
@@ -73,9 +88,9 @@ document.addEventListener("click", function (e) {
             }
           }
 
-          // If a new primary was set, update the UI
-          if (data.new_primary_id) {
-            updatePrimaryBadge(data.new_primary_id);
+          // The primary photo may have moved to the next one
+          if (data.primary_id) {
+            updatePrimaryBadge(data.primary_id);
           }
         }, 300);
       }
@@ -114,26 +129,12 @@ document.addEventListener("click", async function (e) {
   btn.textContent = "Bezig...";
 
   try {
-    const res = await fetch(`/property/image/${imageId}/set-primary`, {
-      method: "POST",
-      headers: {
-        "X-Requested-With": "XMLHttpRequest",
-        Accept: "application/json",
-      },
-    });
-
-    if (!res.ok) {
-      throw new Error(`HTTP error! status: ${res.status}`);
-    }
-
-    const data = await res.json();
-
-    if (!data.success) {
-      throw new Error(data.error || "Failed to set primary image");
-    }
+    const data = await sendImageOperations([
+      { op: "set_primary", id: Number(imageId) },
+    ]);
 
     // Update all badges and buttons
-    updatePrimaryBadge(imageId);
+    updatePrimaryBadge(data.primary_id);
 
     // Success feedback
     btn.textContent = "✓ Hoofdfoto";
@@ -286,39 +287,19 @@ function savePhotoOrder() {
 
   const order = [];
 
-  grid.querySelectorAll(".edit-image-card").forEach((card, index) => {
+  grid.querySelectorAll(".edit-image-card").forEach((card) => {
     const imageId = card.dataset.imageId;
     if (imageId) {
-      order.push({
-        id: imageId,
-        sort_order: index,
-      });
+      order.push(Number(imageId));
     }
   });
 
   if (order.length === 0) return;
 
-  fetch("/property/image/reorder", {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-      "X-Requested-With": "XMLHttpRequest",
-    },
-    body: JSON.stringify({ order }),
-  })
-    .then((res) => {
-      if (!res.ok) {
-        throw new Error("Failed to save order");
-      }
-      return res.json();
-    })
-    .then((data) => {
-      if (data.success) {
-        // Show success feedback
-        showToast("Volgorde opgeslagen", "success");
-      } else {
-        throw new Error("Server returned failure");
-      }
+  sendImageOperations([{ op: "reorder", order }])
+    .then(() => {
+      // Show success feedback
+      showToast("Volgorde opgeslagen", "success");
     })
     .catch((error) => {
       console.error("Reorder error:", error);